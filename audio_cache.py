@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# ذاكرة مؤقتة على القرص لملفات الأذان بعد فك ضغطها (PCM) بحسب بصمة الملف وصيغة mixer.
+# يُفك ملف MP3 مرة واحدة فقط، وبعدها يُفتح الملف بـ mmap ولا يُقرأ منه إلا الجزء الذي سيُشغَّل.
+import os
+import mmap
+import hashlib
+
+AUDIO_CACHE_DIR = "audio_cache"
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(path, mixer_format, directory=AUDIO_CACHE_DIR):
+    frequency, size, channels = mixer_format
+    return os.path.join(directory, f"{file_hash(path)}_{frequency}_{size}_{channels}.pcm")
+
+
+class DecodedAudio:
+    def __init__(self, path, mixer_format):
+        self.path = path
+        self.frequency, self.size, self.channels = mixer_format
+        self.frame_bytes = abs(self.size) // 8 * self.channels
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.frames = len(self._mmap) // self.frame_bytes
+
+    @property
+    def duration(self):
+        return self.frames / self.frequency
+
+    def frames_for(self, seconds):
+        if seconds is None:
+            return self.frames
+        return max(0, min(self.frames, int(seconds * self.frequency)))
+
+    def view(self, seconds=None, start_frame=0):
+        # جزء من الصوت بدون نسخ (memoryview على mmap)
+        end_frame = min(self.frames, start_frame + self.frames_for(seconds))
+        return memoryview(self._mmap)[start_frame * self.frame_bytes:end_frame * self.frame_bytes]
+
+    def warm(self, seconds):
+        # قراءة أول الصوت حتى تكون صفحاته في الذاكرة قبل الموعد (بعد ساعات من الخمول قد يُخرجها النظام)
+        end = self.frames_for(seconds) * self.frame_bytes
+        try:
+            self._mmap.madvise(mmap.MADV_WILLNEED, 0, end)
+        except (AttributeError, OSError, ValueError):
+            pass
+        touched = 0
+        for offset in range(0, end, mmap.PAGESIZE):
+            touched += self._mmap[offset]
+        return end
+
+    def close(self):
+        try:
+            self._mmap.close()
+        except BufferError:
+            # ما زال هناك memoryview مفتوح، سيُغلق عند تحرير الكائن
+            pass
+
+
+def active_format(mixer_format):
+    # pygame يفك الملف بصيغة mixer الحالية إن كان مهيأ، وإلا بالصيغة المطلوبة
+    import pygame
+    return tuple(pygame.mixer.get_init() or mixer_format)
+
+
+def decode_to_cache(path, target, mixer_format):
+    # فك الملف بواسطة pygame. إذا لم يكن mixer مهيأ نهيئه مؤقتًا بمشغل صوت وهمي
+    # حتى لا نفتح جهاز الصوت لمجرد فك الملف (مسار sounddevice لا يستخدم mixer).
+    # يرجع الصيغة التي فُك بها الملف فعلًا
+    import pygame
+    started = False
+    if not pygame.mixer.get_init():
+        frequency, size, channels = mixer_format
+        old_driver = os.environ.get("SDL_AUDIODRIVER")
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        try:
+            pygame.mixer.init(frequency=frequency, size=size, channels=channels)
+        finally:
+            if old_driver is None:
+                del os.environ["SDL_AUDIODRIVER"]
+            else:
+                os.environ["SDL_AUDIODRIVER"] = old_driver
+        started = True
+    try:
+        used = tuple(pygame.mixer.get_init())
+        raw = pygame.mixer.Sound(path).get_raw()
+    finally:
+        if started:
+            pygame.mixer.quit()
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp_path = target + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(raw)
+    os.replace(tmp_path, target)
+    return used
+
+
+def load(path, mixer_format, directory=AUDIO_CACHE_DIR):
+    # المفتاح هو صيغة البيانات الفعلية: إذا كان mixer مهيأ بصيغة أخرى تُخزن وتُقرأ بصيغته
+    mixer_format = active_format(mixer_format)
+    target = cache_path(path, mixer_format, directory)
+    if not os.path.exists(target) or os.path.getsize(target) == 0:
+        used = decode_to_cache(path, target, mixer_format)
+        if used != mixer_format:
+            # تهيأ mixer بصيغة أخرى أثناء الفك
+            mixer_format = used
+            actual = cache_path(path, used, directory)
+            os.replace(target, actual)
+            target = actual
+    return DecodedAudio(target, mixer_format)
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# تشغيل الأذان عبر sounddevice (PortAudio) بنمط callback على جهاز إخراج محدد.
+# الصوت يُقرأ مباشرة من PCM المخزن في audio_cache (mmap) كتلة بكتلة مع تدرج في بداية ونهاية الصوت.
+import time
+import weakref
+import threading
+
+import numpy as np
+import sounddevice as sd
+
+STREAM_BLOCK_SIZE = 512     # حجم الكتلة بالإطارات (أصغر = زمن استجابة أقل واستهلاك معالج أعلى)
+
+_open_streams = weakref.WeakSet()   # StreamPlayback لم تُغلق بعد
+
+
+def rescan_devices(log=None):
+    # PortAudio لا يرى الأجهزة التي وُصلت أو فُصلت بعد تهيئته، فنعيد تهيئته،
+    # لكن فقط إذا لم يكن هناك stream يعمل (إعادة التهيئة تغلقها كلها). الـ streams التي انتهت
+    # (أذان اكتمل ولم يُستدعَ stop) تُغلق أولًا
+    streams = [s for s in list(_open_streams) if not s.closed]
+    if not any(not s.finished.is_set() for s in streams):
+        for playback in streams:
+            try:
+                playback.close()
+            except Exception:
+                pass
+        try:
+            sd._terminate()
+            sd._initialize()
+        except Exception as e:
+            message = f"تعذر إعادة تهيئة أجهزة الصوت: {e}"
+            if log is None:
+                print(message)
+            else:
+                log(message, level="warning", event="audio_rescan_failed")
+    return sd.query_devices()
+
+
+def device_index(device):
+    # "3 - Speakers (Realtek)" -> 3 ، و None للجهاز الافتراضي
+    if device is None or device == "":
+        return None
+    if isinstance(device, int):
+        return device
+    try:
+        return int(str(device).split(" - ", 1)[0])
+    except ValueError:
+        return None
+
+
+class StreamPlayback:
+    def __init__(self, audio, device=None, volume=0.8, duration=None, loop=True,
+                 fade_in=0.0, fade_out=0.0, block_size=STREAM_BLOCK_SIZE, on_finished=None, hold=False):
+        # audio: كائن DecodedAudio بصيغة 16 بت
+        # hold: يبدأ الـ stream بصمت (لإيقاظ الجهاز قبل الموعد) ولا يخرج الصوت حتى release()
+        self.audio = audio
+        self.volume = volume
+        self.loop = loop
+        self.on_finished = on_finished
+        self.samples = np.frombuffer(audio.view(), dtype=np.int16).reshape(-1, audio.channels)
+        self.fade_in_frames = int(fade_in * audio.frequency)
+        self.fade_out_frames = int(fade_out * audio.frequency)
+        self.position = 0
+        self.played = 0
+        if duration is not None:
+            self.end_frame = int(duration * audio.frequency)
+        elif not loop:
+            self.end_frame = len(self.samples)
+        else:
+            self.end_frame = None
+        self.latency = None
+        self.first_audio = None     # طابع time.time() لخروج أول عينة من الجهاز
+        self.finished = threading.Event()
+        self.hold = hold
+        self.closed = False
+        self._start_time = None
+        self._lock = threading.Lock()
+
+        index = device_index(device)
+        max_channels = sd.query_devices(index, "output")["max_output_channels"]
+        self.channels = max(1, min(audio.channels, max_channels))
+        self.stream = sd.OutputStream(
+            samplerate=audio.frequency,
+            channels=self.channels,
+            dtype="float32",
+            device=index,
+            blocksize=block_size,
+            latency="low",
+            callback=self._callback,
+            finished_callback=self._finished,
+        )
+        _open_streams.add(self)
+
+    def start(self):
+        self._start_time = self.stream.time
+        self.stream.start()
+
+    def release(self):
+        # بدء الصوت في stream بدأ بصمت: الكتلة التالية تحمل أول الأذان
+        self._start_time = self.stream.time
+        self.hold = False
+
+    def stop(self, fade=True):
+        # مع التدرج: ينتهي الصوت بعد fade_out ثانية، وبدونه يتوقف فورًا
+        with self._lock:
+            if fade and self.fade_out_frames:
+                end = self.played + self.fade_out_frames
+                self.end_frame = end if self.end_frame is None else min(self.end_frame, end)
+                return
+        self.stream.abort()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.stream.close()
+
+    def _read(self, frames):
+        out = np.zeros((frames, self.samples.shape[1]), dtype=np.float32)
+        total = len(self.samples)
+        filled = 0
+        while filled < frames and total:
+            n = min(frames - filled, total - self.position)
+            out[filled:filled + n] = self.samples[self.position:self.position + n]
+            self.position += n
+            filled += n
+            if self.position >= total:
+                if not self.loop:
+                    break
+                self.position = 0
+        out *= 1.0 / 32768.0
+        if self.channels < out.shape[1]:
+            out = out.mean(axis=1, keepdims=True)
+        return out
+
+    def _callback(self, outdata, frames, time_info, status):
+        if self.hold:
+            outdata.fill(0)
+            return
+        if self.latency is None:
+            # الزمن من طلب التشغيل حتى خروج أول عينة من الجهاز (بساعة PortAudio)
+            dac_time = time_info.outputBufferDacTime or time_info.currentTime
+            self.latency = max(0.0, dac_time - self._start_time)
+            self.first_audio = time.time() + max(0.0, dac_time - time_info.currentTime)
+
+        with self._lock:
+            end_frame = self.end_frame
+        index = self.played + np.arange(frames)
+        gain = np.full(frames, self.volume, dtype=np.float32)
+        if self.fade_in_frames:
+            gain *= np.clip(index / self.fade_in_frames, 0.0, 1.0)
+        if end_frame is not None:
+            remaining = end_frame - index
+            if self.fade_out_frames:
+                gain *= np.clip(remaining / self.fade_out_frames, 0.0, 1.0)
+            gain[remaining <= 0] = 0.0
+
+        outdata[:] = self._read(frames) * gain[:, None]
+        self.played += frames
+        if end_frame is not None and self.played >= end_frame:
+            raise sd.CallbackStop
+
+    def _finished(self):
+        self.finished.set()
+        if self.on_finished:
+            self.on_finished(self)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# قياس زمن بدء التشغيل:
+#   - تفصيل -X importtime لأثقل الوحدات عند استيراد adhan (الواجهة) وdaemon (بدون واجهة)
+#   - الزمن حتى أول عرض للنافذة (adhan.py --startup-benchmark) ويحتاج شاشة
+#   - الزمن حتى تجهيز PrayerService بدون واجهة
+# الاستخدام: python benchmarks/bench_startup.py [--runs 5] [--top 15]
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_breakdown(module, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue
+        rows.append({"module": parts[2].strip(), "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000})
+    total = next((r["cumulative_ms"] for r in rows if r["module"] == module), None)
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return {"module": module, "total_ms": total, "top": rows[:top], "ok": result.returncode == 0}
+
+
+def time_until_marker(args, marker, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen(args, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        found = False
+        for line in proc.stdout:
+            if line.strip() == marker:
+                samples.append((time.perf_counter() - start) * 1000)
+                found = True
+                break
+        proc.kill()
+        proc.wait()
+        if not found:
+            return {"error": f"{marker} not reached (exit code {proc.returncode})"}
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "imports": [import_breakdown("adhan", args.top), import_breakdown("daemon", args.top)],
+        "first_paint": time_until_marker([sys.executable, "adhan.py", "--startup-benchmark"], "first-paint", args.runs),
+        "headless_ready": time_until_marker(
+            [sys.executable, "-c", "import service; service.PrayerService(); print('ready', flush=True)"],
+            "ready", args.runs,
+        ),
+    }
+    json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
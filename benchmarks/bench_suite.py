@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+# مجموعة قياسات قابلة للتكرار، تعمل بدون شاشة وبدون بطاقة صوت (SDL_AUDIODRIVER=dummy) وتطبع JSON:
+#   timings   تحديث المواقيت عبر update_timings من خادم محلي (stub_server) ثم التحديث المشروط (304)
+#   render    سرعة format_time، وعرض المواقيت بـ TimingsView مقابل إعادة بناء Text كاملًا (يحتاج شاشة)
+#   scheduler دقة استيقاظ PrayerScheduler مقارنة بالفحص الدوري القديم كل 5 ثوانٍ
+#   player    زمن تحميل/تبديل AdhanPlayer وذاكرة RSS لكل من adhan1.mp3 و adhan2.mp3
+#   startup   زمن بدء التشغيل (من bench_startup.py)
+#   tray      ذاكرة RSS وعدد مرات استيقاظ الخيوط في الخلفية: نافذة مخفية (withdraw) مقابل هدم النافذة
+# الاستخدام: python benchmarks/bench_suite.py [--only timings,scheduler] [--quick] [--out results.json]
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import threading
+from datetime import datetime
+
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+
+CASES = ["timings", "render", "scheduler", "player", "startup", "tray"]
+CHECK_INTERVAL = 5          # فترة الفحص في الحلقة القديمة check_prayer_time_loop
+BENCH_CITY = "الرياض"
+
+
+def summarize(samples, scale=1000.0):
+    # النتائج بالمللي ثانية
+    samples = sorted(s * scale for s in samples)
+    if not samples:
+        return {"n": 0}
+    return {
+        "n": len(samples),
+        "median_ms": round(statistics.median(samples), 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+class TempCwd:
+    # كل حالة تعمل في مجلد مؤقت حتى لا تلمس config.json ومجلدات التخزين الحقيقية
+    def __enter__(self):
+        self.old = os.getcwd()
+        self.path = tempfile.mkdtemp(prefix="adhan-bench-")
+        os.chdir(self.path)
+        return self.path
+
+    def __exit__(self, *exc):
+        os.chdir(self.old)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def bench_timings(args):
+    from stub_server import StubServer, calendar_payload
+    from prayer_data import CITIES, TIMEZONE_MAPPING, METHOD_MAPPING
+    from eventlog import EventLog
+    from fetcher import parse_calendar
+    import service
+
+    runs = 5 if args.quick else 20
+    lat, lng = CITIES[BENCH_CITY]
+    payload = calendar_payload(lat, lng, METHOD_MAPPING[BENCH_CITY], TIMEZONE_MAPPING[BENCH_CITY], 2025, 1)
+    parse_samples = []
+    for _ in range(runs * 10):
+        start = time.perf_counter()
+        parse_calendar(payload)
+        parse_samples.append(time.perf_counter() - start)
+
+    result = {"parse_calendar": summarize(parse_samples)}
+    with StubServer(latency=args.latency) as stub, TempCwd():
+        with open(service.CONFIG_FILE, "w", encoding="utf-8") as f:
+            json.dump({"city": BENCH_CITY, "timings_source": "api", "api_url": stub.calendar_url}, f)
+
+        cold, warm, refresh = [], [], []
+        for _ in range(runs):
+            shutil.rmtree("timetable", ignore_errors=True)
+            svc = service.PrayerService(events=EventLog(path=None))
+            start = time.perf_counter()
+            ok = svc.update_timings()
+            cold.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            svc.update_timings()
+            warm.append(time.perf_counter() - start)
+            today = datetime.now().date()
+            start = time.perf_counter()
+            svc.store.refresh(BENCH_CITY, METHOD_MAPPING[BENCH_CITY], today.year, today.month)
+            refresh.append(time.perf_counter() - start)
+            svc.stop()
+            if not ok:
+                return {"error": "update_timings failed against the stub server"}
+        result.update({
+            "stub_latency_ms": args.latency * 1000,
+            "update_cold": summarize(cold),
+            "update_warm": summarize(warm),
+            "refresh_conditional": summarize(refresh),
+            "stub_requests": stub.requests,
+            "stub_not_modified": stub.not_modified,
+        })
+    return result
+
+
+def bench_render(args):
+    from types import SimpleNamespace
+    import adhan
+
+    runs = 2000 if args.quick else 20000
+    timings = {"Fajr": "04:58", "Dhuhr": "12:06", "Asr": "15:26", "Maghrib": "17:55", "Isha": "19:25"}
+    result = {}
+    for use_24h in (True, False):
+        app = SimpleNamespace(time_format_24h=use_24h)
+        start = time.perf_counter()
+        for _ in range(runs):
+            for t in timings.values():
+                adhan.PrayerApp.format_time(app, t)
+        elapsed = time.perf_counter() - start
+        result["format_time_24h" if use_24h else "format_time_12h"] = {
+            "calls": runs * len(timings),
+            "per_call_us": round(elapsed / (runs * len(timings)) * 1e6, 3),
+        }
+
+    # العرض يحتاج نافذة Tk حقيقية
+    try:
+        root = adhan.tb.Window()
+        root.withdraw()
+    except Exception as e:
+        result["display_timings"] = {"skipped": f"no display: {e}"}
+        return result
+    try:
+        from timings_view import TimingsView
+        from prayer_data import VALID_PRAYERS, PRAYER_NAMES_AR
+
+        # نفس الحمل للطريقتين: تحديثات بنفس المواقيت مع تبديل صيغة الوقت كل 10 تحديثات،
+        # وثوانٍ من العد التنازلي (tick) لا تعرفها الطريقة القديمة
+        refreshes = runs // 20
+        app = SimpleNamespace(time_format_24h=True)
+        format_time = lambda t: adhan.PrayerApp.format_time(app, t)
+
+        text = adhan.tb.Text(root, height=8)
+        text.pack()
+        samples = []
+        for i in range(refreshes):
+            app.time_format_24h = (i // 10) % 2 == 0
+            start = time.perf_counter()
+            text.configure(state="normal")
+            text.delete("1.0", "end")
+            for prayer in VALID_PRAYERS:
+                text.insert("end", f"{PRAYER_NAMES_AR[prayer]} : {format_time(timings[prayer])}\n")
+            text.configure(state="disabled")
+            root.update_idletasks()
+            samples.append(time.perf_counter() - start)
+        result["full_rebuild"] = dict(summarize(samples), redraws=refreshes * (len(VALID_PRAYERS) + 1))
+
+        upcoming = ("Asr", time.time() + 3600)
+        view = TimingsView(root, format_time, lambda: upcoming)
+        view.pack()
+        samples = []
+        for i in range(refreshes):
+            app.time_format_24h = (i // 10) % 2 == 0
+            start = time.perf_counter()
+            view.update(timings)
+            root.update_idletasks()
+            samples.append(time.perf_counter() - start)
+        view.stop()
+        update_redraws = view.redraws
+        ticks = []
+        for _ in range(refreshes):
+            start = time.perf_counter()
+            view.tick()
+            root.update_idletasks()
+            ticks.append(time.perf_counter() - start)
+        view.stop()
+        result["incremental_update"] = dict(summarize(samples), redraws=update_redraws)
+        result["countdown_tick"] = dict(summarize(ticks), redraws=view.redraws - update_redraws)
+    finally:
+        root.destroy()
+    return result
+
+
+def bench_scheduler(args):
+    from scheduler import PrayerScheduler
+
+    window = 6.0 if args.quick else 15.0
+    count = 10 if args.quick else 30
+    now = time.time()
+    deadlines = sorted(now + 0.5 + random.random() * window for _ in range(count))
+
+    event_late = []
+    done = threading.Event()
+    scheduler = PrayerScheduler()
+    scheduler.start()
+
+    def fire(when):
+        event_late.append(time.time() - when)
+        if len(event_late) == count:
+            done.set()
+
+    for i, when in enumerate(deadlines):
+        scheduler.schedule(when, i, fire, when)
+
+    # نفس الحلقة القديمة: فحص ثم نوم CHECK_INTERVAL ثانية
+    poll_late = []
+    stop = threading.Event()
+
+    def poll_loop():
+        pending = list(deadlines)
+        while pending and not stop.is_set():
+            current = time.time()
+            while pending and pending[0] <= current:
+                poll_late.append(current - pending.pop(0))
+            time.sleep(args.poll_interval)
+
+    poller = threading.Thread(target=poll_loop, daemon=True)
+    poller.start()
+    done.wait(window + 5)
+    poller.join(window + args.poll_interval + 5)
+    stop.set()
+    scheduler.stop()
+    return {
+        "deadlines": count,
+        "window_s": window,
+        "event_scheduler": summarize(event_late),
+        "polling": dict(summarize(poll_late), interval_s=args.poll_interval),
+    }
+
+
+def player_child(adhan_file, other_file, backend):
+    # يعمل في عملية منفصلة حتى تكون قياسات RSS وفك الملف (cache بارد) مستقلة لكل ملف
+    with TempCwd():
+        start = time.perf_counter()
+        from player import AdhanPlayer
+        import_ms = (time.perf_counter() - start) * 1000
+        base_rss = rss_mb()
+
+        player = AdhanPlayer(adhan_file=os.path.join(ROOT, adhan_file), backend=backend)
+        start = time.perf_counter()
+        audio = player.preload()
+        cold_ms = (time.perf_counter() - start) * 1000
+        loaded_rss = rss_mb()
+
+        warm = AdhanPlayer(adhan_file=os.path.join(ROOT, adhan_file), backend=backend)
+        start = time.perf_counter()
+        warm.preload()
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        player.play(duration=15)
+        play_ms = (time.perf_counter() - start) * 1000
+        playing_rss = rss_mb()
+        player.stop()
+
+        # تبديل الصوت مرتين: الأول يفك الملف الآخر، والثاني يرجع لملف موجود في الـ cache
+        start = time.perf_counter()
+        player.change_sound(os.path.join(ROOT, other_file))
+        switch_cold_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        player.change_sound(os.path.join(ROOT, adhan_file))
+        switch_warm_ms = (time.perf_counter() - start) * 1000
+
+        try:
+            import resource
+            peak = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        except Exception:
+            peak = None
+        return {
+            "file": adhan_file,
+            "backend": "sounddevice" if player.uses_stream() else "pygame",
+            "duration_s": round(audio.duration, 1),
+            "import_ms": round(import_ms, 1),
+            "load_cold_ms": round(cold_ms, 1),
+            "load_warm_ms": round(warm_ms, 1),
+            "play_return_ms": round(play_ms, 2),
+            "switch_cold_ms": round(switch_cold_ms, 1),
+            "switch_warm_ms": round(switch_warm_ms, 1),
+            "rss_base_mb": base_rss,
+            "rss_loaded_mb": loaded_rss,
+            "rss_playing_mb": playing_rss,
+            "rss_peak_mb": peak,
+        }
+
+
+def bench_player(args):
+    from player import ADHAN_FILES
+
+    results = []
+    for i, adhan_file in enumerate(ADHAN_FILES):
+        other = ADHAN_FILES[(i + 1) % len(ADHAN_FILES)]
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child-player", adhan_file, other, "--backend", args.backend],
+            capture_output=True, text=True, timeout=300,
+        )
+        try:
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        except Exception:
+            results.append({"file": adhan_file, "error": proc.stderr.strip()[-500:]})
+    return results
+
+
+def bench_startup(args):
+    import bench_startup as startup
+
+    runs = 2 if args.quick else 5
+    return {
+        "import_adhan": startup.import_breakdown("adhan", 5),
+        "import_daemon": startup.import_breakdown("daemon", 5),
+        "first_paint": startup.time_until_marker([sys.executable, "adhan.py", "--startup-benchmark"], "first-paint", runs),
+        "headless_ready": startup.time_until_marker(
+            [sys.executable, "-c", "import service; service.PrayerService(); print('ready', flush=True)"],
+            "ready", runs,
+        ),
+    }
+
+
+def context_switches():
+    # مجموع تبديلات السياق لكل خيوط العملية (كل استيقاظ لخيط نائم يُحسب هنا)
+    total = 0
+    try:
+        for task in os.listdir("/proc/self/task"):
+            with open(f"/proc/self/task/{task}/status") as f:
+                for line in f:
+                    if line.startswith(("voluntary_ctxt_switches", "nonvoluntary_ctxt_switches")):
+                        total += int(line.split()[1])
+    except OSError:
+        return None
+    return total
+
+
+def idle_sample(wait, seconds):
+    # wait(seconds) يترك البرنامج خاملًا، والنتيجة RSS في النهاية ومعدل الاستيقاظ في الثانية
+    before = context_switches()
+    wait(seconds)
+    after = context_switches()
+    return {
+        "rss_mb": rss_mb(),
+        "threads": threading.active_count(),
+        "wakeups_per_s": None if before is None else round((after - before) / seconds, 1),
+    }
+
+
+def tray_child(mode, seconds):
+    # أيقونة الشريط نفسها لا تدخل في القياس: هي نفسها في الوضعين
+    with TempCwd():
+        import gc
+        import adhan
+
+        app = adhan.TrayApp()
+        result = {"mode": mode}
+        if mode == "background":
+            app.start_service()
+            time.sleep(2)
+            result["background"] = idle_sample(time.sleep, seconds)
+        else:
+            try:
+                root = adhan.tb.Window(themename="flatly")
+            except Exception as e:
+                app.shutdown()
+                return {"mode": mode, "skipped": f"no display: {e}"}
+            app.window = adhan.PrayerApp(root, app)
+            app.start_service()
+
+            def run_tk(secs):
+                root.after(int(secs * 1000), root.quit)
+                root.mainloop()
+
+            run_tk(2)
+            root.withdraw()
+            result["withdrawn"] = idle_sample(run_tk, seconds)
+            app.window.close()
+            app.window = None
+            gc.collect()
+            result["torn_down"] = idle_sample(time.sleep, seconds)
+        app.shutdown()
+        return result
+
+
+def bench_tray(args):
+    seconds = getattr(args, "seconds", None) or (5 if args.quick else 20)
+    results = {}
+    for mode in ("window", "background"):
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child-tray", mode, str(seconds)],
+            capture_output=True, text=True, timeout=300,
+        )
+        try:
+            results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+        except Exception:
+            results[mode] = {"error": proc.stderr.strip()[-500:]}
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--only", help="قائمة حالات مفصولة بفواصل: " + ",".join(CASES))
+    parser.add_argument("--quick", action="store_true", help="عدد تكرارات أقل")
+    parser.add_argument("--out", help="كتابة النتائج في ملف بدل الشاشة")
+    parser.add_argument("--latency", type=float, default=0.02, help="زمن استجابة الخادم المحلي بالثواني")
+    parser.add_argument("--poll-interval", type=float, default=CHECK_INTERVAL)
+    parser.add_argument("--backend", default="pygame", help="auto أو sounddevice أو pygame")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--child-player", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--child-tray", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child_player:
+        print(json.dumps(player_child(*args.child_player, args.backend)))
+        return 0
+    if args.child_tray:
+        print(json.dumps(tray_child(args.child_tray[0], float(args.child_tray[1]))))
+        return 0
+
+    random.seed(args.seed)
+    cases = args.only.split(",") if args.only else CASES
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "audio_driver": os.environ.get("SDL_AUDIODRIVER"),
+        "quick": args.quick,
+        "results": {},
+    }
+    handlers = {"timings": bench_timings, "render": bench_render, "scheduler": bench_scheduler,
+                "player": bench_player, "startup": bench_startup, "tray": bench_tray}
+    for case in cases:
+        if case not in handlers:
+            parser.error(f"unknown case: {case}")
+        start = time.perf_counter()
+        try:
+            report["results"][case] = handlers[case](args)
+        except Exception as e:
+            report["results"][case] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"{case}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# قياس الذاكرة والاستيقاظ أثناء العمل من شريط المهام: نافذة مخفية (withdraw، السلوك الافتراضي)
+# مقابل نافذة مهدومة ("tray_teardown": true)، ومقارنتهما بالخدمة وحدها بدون أي نافذة.
+# يشغّل Xvfb على شاشة فارغة إن وُجد، وإلا يستخدم $DISPLAY الحالي.
+# الاستخدام: python benchmarks/bench_tray.py [--seconds 20] [--display :99] [--out tray.json]
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import bench_suite
+
+
+def free_display():
+    for number in range(99, 199):
+        if not os.path.exists(f"/tmp/.X11-unix/X{number}") and not os.path.exists(f"/tmp/.X{number}-lock"):
+            return f":{number}"
+    return None
+
+
+def start_xvfb(display):
+    proc = subprocess.Popen(["Xvfb", display, "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':')}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return None
+        if os.path.exists(socket_path):
+            return proc
+        time.sleep(0.1)
+    proc.kill()
+    return None
+
+
+def row(name, sample):
+    if not sample:
+        return f"{name:<12} -"
+    return (f"{name:<12} rss={sample.get('rss_mb')} MB  threads={sample.get('threads')}  "
+            f"wakeups={sample.get('wakeups_per_s')}/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=20, help="مدة كل عينة خمول")
+    parser.add_argument("--display", help="شاشة Xvfb (الافتراضي أول شاشة فارغة من :99)")
+    parser.add_argument("--out", help="كتابة النتائج في ملف JSON")
+    args = parser.parse_args(argv)
+
+    xvfb = None
+    if shutil.which("Xvfb"):
+        display = args.display or free_display()
+        xvfb = start_xvfb(display) if display else None
+        if xvfb is None:
+            print(f"تعذر تشغيل Xvfb على {display}", file=sys.stderr)
+            return 2
+        os.environ["DISPLAY"] = display
+    elif not os.environ.get("DISPLAY"):
+        print("لا يوجد Xvfb ولا DISPLAY: القياس يحتاج شاشة (ثبّت xvfb أو شغّله من جلسة رسومية)",
+              file=sys.stderr)
+        return 2
+
+    try:
+        results = bench_suite.bench_tray(argparse.Namespace(quick=False, seconds=args.seconds))
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+    report = {"display": os.environ.get("DISPLAY"), "xvfb": xvfb is not None,
+              "seconds": args.seconds, "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    window = results.get("window", {})
+    background = results.get("background", {})
+    if "withdrawn" not in window:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return 1
+    print(row("withdrawn", window["withdrawn"]))
+    print(row("torn_down", window.get("torn_down")))
+    print(row("background", background.get("background")))
+    before, after = window["withdrawn"], window.get("torn_down") or {}
+    if before.get("rss_mb") is not None and after.get("rss_mb") is not None:
+        print(f"rss بعد الهدم: {round(after['rss_mb'] - before['rss_mb'], 1):+} MB")
+    if before.get("wakeups_per_s") is not None and after.get("wakeups_per_s") is not None:
+        print(f"الاستيقاظ بعد الهدم: {round(after['wakeups_per_s'] - before['wakeups_per_s'], 1):+}/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+# خادم محلي يحاكي /v1/calendar/{year}/{month} من aladhan.com لاختبار الجلب بدون إنترنت.
+# يدعم ETag/304، وزمن استجابة مصطنع، وفشل أول N طلبات أو نسبة عشوائية منها (503 مع Retry-After).
+# ويحاكي أيضًا ملف version.json وملف التحديث (مع Range/206 وقطع الاتصال في المنتصف) لاختبار updater.py.
+# الاستخدام:
+#   with StubServer(latency=0.05, fail_first=2) as stub:
+#       fetcher = TimingsFetcher(url=stub.calendar_url)
+#   with StubServer() as stub:
+#       stub.publish("1.0.2", data)
+#       stub.cut_after = 100000     # قطع أول تنزيل بعد 100000 بايت
+#       updater = Updater(manifest_url=stub.manifest_url, version="1.0.1")
+# أو كخادم مستقل: python benchmarks/stub_server.py --port 8780 [--release adhan.exe --version 1.0.2]
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prayer_calc
+
+CALENDAR_PATH = re.compile(r"^/v1/calendar/(\d{4})/(\d{1,2})$")
+
+
+def calendar_payload(lat, lng, method, timezone, year, month):
+    table = prayer_calc.month_table(lat, lng, method, timezone, year, month)
+    data = []
+    for iso_day, timings in table.items():
+        y, m, d = iso_day.split("-")
+        data.append({
+            "timings": {k: f"{v} (+03)" for k, v in timings.items()},
+            "date": {"gregorian": {"date": f"{d}-{m}-{y}"}},
+        })
+    return {"code": 200, "status": "OK", "data": data}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub = None
+
+    def do_GET(self):
+        stub = self.stub
+        with stub.lock:
+            stub.requests += 1
+            count = stub.requests
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        parsed = urlparse(self.path)
+        if parsed.path == "/version.json" and stub.manifest is not None:
+            body = json.dumps(stub.manifest).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                return self.reply(304, b"", {"ETag": etag})
+            return self.reply(200, body, {"ETag": etag, "Content-Type": "application/json"})
+        if parsed.path in stub.files:
+            return self.serve_file(stub.files[parsed.path])
+        match = CALENDAR_PATH.match(parsed.path)
+        if not match:
+            return self.reply(404, b"{}")
+        if count <= stub.fail_first or random.random() < stub.fail_rate:
+            with stub.lock:
+                stub.failures += 1
+            return self.reply(503, b"{}", {"Retry-After": str(stub.retry_after)})
+
+        q = parse_qs(parsed.query)
+        try:
+            lat = float(q["latitude"][0])
+            lng = float(q["longitude"][0])
+            method = int(q.get("method", ["2"])[0])
+            timezone = q.get("timezonestring", ["UTC"])[0]
+        except (KeyError, ValueError):
+            return self.reply(400, b"{}")
+        year, month = int(match.group(1)), int(match.group(2))
+
+        body = json.dumps(calendar_payload(lat, lng, method, timezone, year, month)).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            with stub.lock:
+                stub.not_modified += 1
+            return self.reply(304, b"", {"ETag": etag})
+        self.reply(200, body, {"ETag": etag, "Content-Type": "application/json"})
+
+    def serve_file(self, data):
+        stub = self.stub
+        etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        start = 0
+        requested = self.headers.get("Range", "")
+        if_range = self.headers.get("If-Range")
+        if requested.startswith("bytes=") and (if_range is None or if_range == etag):
+            try:
+                start = int(requested[6:].split("-")[0])
+            except ValueError:
+                start = 0
+            if start >= len(data):
+                return self.reply(416, b"", {"Content-Range": f"bytes */{len(data)}"})
+            with stub.lock:
+                stub.range_requests += 1
+        body = data[start:]
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        with stub.lock:
+            cut, stub.cut_after = stub.cut_after, None
+        if cut is not None and cut < len(body):
+            # محاكاة انقطاع الاتصال في منتصف التنزيل
+            self.wfile.write(body[:cut])
+            self.wfile.flush()
+            self.close_connection = True
+            with stub.lock:
+                stub.bytes_sent += cut
+            return
+        self.wfile.write(body)
+        with stub.lock:
+            stub.bytes_sent += len(body)
+
+    def reply(self, code, body, headers=None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, fail_first=0, fail_rate=0.0, retry_after=0):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_rate = fail_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self.failures = 0
+        self.not_modified = 0
+        self.manifest = None        # محتوى version.json، أو None قبل publish
+        self.files = {}             # المسار -> البيانات
+        self.cut_after = None       # قطع الاستجابة التالية لملف بعد هذا العدد من البايتات (مرة واحدة)
+        self.range_requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        handler = type("BoundStubHandler", (StubHandler,), {"stub": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def calendar_url(self):
+        return self.base_url + "/v1/calendar/{year}/{month}"
+
+    @property
+    def manifest_url(self):
+        return self.base_url + "/version.json"
+
+    def publish(self, version, data, name="adhan.exe"):
+        path = f"/releases/{version}/{name}"
+        self.files[path] = data
+        self.manifest = {"version": version, "url": self.base_url + path,
+                         "sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+        return self.manifest
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--release", help="ملف يُنشر كتحديث في version.json")
+    parser.add_argument("--version", default="99.0.0")
+    args = parser.parse_args(argv)
+    stub = StubServer(port=args.port, latency=args.latency, fail_rate=args.fail_rate)
+    print(f"stub calendar API: {stub.calendar_url}", flush=True)
+    if args.release:
+        with open(args.release, "rb") as f:
+            stub.publish(args.version, f.read(), os.path.basename(args.release))
+        print(f"stub update manifest: {stub.manifest_url}", flush=True)
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
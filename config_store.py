@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# حفظ config.json في الخلفية: تجميع التغييرات المتتالية (مثل سحب شريط الصوت) في كتابة واحدة،
+# وعدم الكتابة إذا لم يتغير شيء، والكتابة الذرية (ملف مؤقت + fsync + استبدال)
+# حتى لا يبقى ملف إعدادات مقطوع إذا توقف البرنامج أثناء الحفظ.
+import os
+import json
+import time
+import threading
+
+CONFIG_SAVE_DELAY = 1.0     # ثوانٍ من الهدوء قبل الكتابة على القرص
+
+
+class ConfigStore:
+    def __init__(self, path, delay=CONFIG_SAVE_DELAY, on_saved=None, on_error=None):
+        self.path = path
+        self.delay = delay
+        self.on_saved = on_saved
+        self.on_error = on_error
+        self._cond = threading.Condition()
+        self._pending = None
+        self._deadline = None
+        self._last_written = None
+        self._thread = None
+        self._closed = False
+        self._write_lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = f.read()
+        cfg = json.loads(data)
+        self._last_written = json.dumps(cfg, ensure_ascii=False, indent=2)
+        return cfg
+
+    def save(self, cfg):
+        # نأخذ نسخة نصية الآن حتى لا تتأثر الكتابة بتعديلات لاحقة على القاموس
+        data = json.dumps(cfg, ensure_ascii=False, indent=2)
+        with self._cond:
+            if data == self._last_written and self._pending is None:
+                return
+            self._pending = data
+            self._deadline = time.monotonic() + self.delay
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self):
+        # أخذ البيانات وكتابتها تحت نفس القفل: خيط الحفظ و flush() لا يمكن أن يكتب أحدهما
+        # نسخة أقدم فوق نسخة أحدث كتبها الآخر. ترتيب الأقفال دائمًا _write_lock ثم _cond
+        with self._write_lock:
+            with self._cond:
+                data = self._pending
+                self._pending = None
+                self._deadline = None
+            if data is not None:
+                self._write_locked(data)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self.flush()
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                if self._pending is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                self._cond.release()
+                try:
+                    self.flush()
+                finally:
+                    self._cond.acquire()
+            self._thread = None
+
+    def _write_locked(self, data):
+        if data == self._last_written:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_written = data
+            if self.on_saved:
+                self.on_saved()
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
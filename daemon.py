@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# تشغيل البرنامج كخدمة بدون واجهة رسومية (بدون Tk/ttkbootstrap)
+# مع واجهة تحكم محلية عبر HTTP على 127.0.0.1:
+#   GET  /status  حالة الخدمة والمواقيت
+#   GET  /next    الصلاة القادمة
+#   POST /play    تشغيل الأذان
+#   POST /stop    إيقاف الأذان
+#   GET  /metrics قياسات التوقيت بصيغة Prometheus (أو JSON مع ?format=json)
+#   GET  /logs    آخر الأحداث من سجل الأحداث (?n=100&since=رقم_الحدث)
+#   POST /reload  إعادة تحميل config.json وتحديث المواقيت
+# الحماية: أي صفحة ويب مفتوحة في المتصفح تستطيع إرسال طلب إلى 127.0.0.1، لذلك:
+#   - كل طلب يجب أن يكون Host (و Origin إن وُجد) فيه localhost أو عنوان التشغيل (ضد DNS rebinding)
+#   - طلبات POST تحتاج الرمز "control_token" من config.json (يُنشأ عند أول تشغيل) في الترويسة X-Adhan-Token:
+#       curl -X POST -H "X-Adhan-Token: <control_token>" http://127.0.0.1:8765/play
+import sys
+import hmac
+import json
+import argparse
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from service import PrayerService, check_already_running
+from updater import install_staged, relaunch
+
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 8765
+TOKEN_HEADER = "X-Adhan-Token"
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    service = None
+    allowed_hosts = LOCAL_HOSTS
+
+    def is_local_request(self):
+        host = urlparse("//" + self.headers.get("Host", "")).hostname
+        if host not in self.allowed_hosts:
+            return False
+        origin = self.headers.get("Origin")
+        return origin is None or urlparse(origin).hostname in self.allowed_hosts
+
+    def is_authorized(self):
+        token = self.headers.get(TOKEN_HEADER, "")
+        return hmac.compare_digest(token.encode("utf-8"), self.service.control_token().encode("utf-8"))
+
+    def do_GET(self):
+        if not self.is_local_request():
+            return self.reply(403, {"error": "forbidden"})
+        parsed = urlparse(self.path)
+        if parsed.path == "/logs":
+            q = parse_qs(parsed.query)
+            try:
+                n = int(q.get("n", ["100"])[0])
+                since = int(q.get("since", ["0"])[0])
+            except ValueError:
+                return self.reply(400, {"error": "bad query"})
+            self.reply(200, self.service.events.recent(n, since))
+        elif parsed.path == "/metrics":
+            if parse_qs(parsed.query).get("format") == ["json"]:
+                self.reply(200, self.service.metrics.to_json())
+            else:
+                self.reply_text(200, self.service.metrics.to_prometheus())
+        elif parsed.path == "/status":
+            self.reply(200, self.service.status())
+        elif parsed.path == "/next":
+            upcoming = self.service.next_prayer()
+            if upcoming:
+                prayer, when = upcoming
+                self.reply(200, {"prayer": prayer, "time": datetime.fromtimestamp(when, self.service.city_zone()).isoformat(timespec="seconds")})
+            else:
+                self.reply(200, {"prayer": None})
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.is_local_request() or not self.is_authorized():
+            return self.reply(403, {"error": "forbidden"})
+        parsed = urlparse(self.path)
+        if parsed.path == "/play":
+            self.service.play()
+            self.reply(200, {"ok": True})
+        elif parsed.path == "/stop":
+            self.service.stop_playback()
+            self.reply(200, {"ok": True})
+        elif parsed.path == "/reload":
+            self.reply(200, {"ok": self.service.reload()})
+        else:
+            self.reply(404, {"error": "not found"})
+
+    def reply(self, code, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_text(self, code, text):
+        body = text.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_control_server(service, host=CONTROL_HOST, port=CONTROL_PORT):
+    # الطلبات تُقبل باسم localhost أو بالعنوان الذي تعمل عليه الواجهة (مثل --host 192.168.1.5)
+    handler = type("BoundControlHandler", (ControlHandler,),
+                   {"service": service, "allowed_hosts": LOCAL_HOSTS + (host.strip("[]"),)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="مواقيت الصلاة - وضع الخدمة بدون واجهة")
+    parser.add_argument("--host", default=CONTROL_HOST)
+    parser.add_argument("--port", type=int, default=CONTROL_PORT)
+    args = parser.parse_args(argv)
+
+    sock = check_already_running()
+    if not sock:
+        print("البرنامج مفتوح بالفعل!")
+        return 1
+    if install_staged():
+        sock.close()
+        relaunch(argv)
+
+    service = PrayerService()
+    service.control_token()
+    service.start()
+    server = make_control_server(service, args.host, args.port)
+    service.log(f"واجهة التحكم تعمل على http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# سجل أحداث محدود الحجم: آخر RING_SIZE حدث في الذاكرة (deque)، وملف سجل يُدوَّر عند LOG_MAX_BYTES،
+# ومخرج اختياري على الشاشة لوضع الخدمة. نافذة السجل في الواجهة تعرض آخر الأحداث فقط.
+import json
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+LOG_FILE = "adhan.log"
+LOG_MAX_BYTES = 512 * 1024
+LOG_BACKUPS = 3
+RING_SIZE = 500
+
+LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "error": logging.ERROR}
+
+
+class EventLog:
+    def __init__(self, capacity=RING_SIZE, path=LOG_FILE, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS, echo=False):
+        self.events = deque(maxlen=capacity)
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._seq = 0
+
+        self.logger = logging.Logger("adhan")
+        formatter = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
+        if path:
+            try:
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+                handler.setFormatter(formatter)
+                self.logger.addHandler(handler)
+            except Exception as e:
+                print(f"تعذر فتح ملف السجل: {e}")
+        if echo:
+            stream = logging.StreamHandler()
+            stream.setFormatter(formatter)
+            self.logger.addHandler(stream)
+
+    def emit(self, message, level="info", **fields):
+        # fields: بيانات منظمة مثل event="prayer_due" و prayer="Fajr"
+        with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, "time": datetime.now().isoformat(timespec="seconds"), "level": level, "message": message}
+            event.update(fields)
+            self.events.append(event)
+            listeners = list(self._listeners)
+
+        extra = f" {json.dumps(fields, ensure_ascii=False, default=str)}" if fields else ""
+        self.logger.log(LEVELS.get(level, logging.INFO), f"{message}{extra}")
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                pass
+        return event
+
+    __call__ = emit
+
+    def subscribe(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def recent(self, n=None, since=0):
+        with self._lock:
+            events = [e for e in self.events if e["seq"] > since]
+        return events if n is None else events[-n:]
+
+    def close(self):
+        for handler in list(self.logger.handlers):
+            handler.close()
+            self.logger.removeHandler(handler)
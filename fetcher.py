@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# جلب جداول المواقيت من aladhan.com:
+#   - جلسة requests واحدة مع تجمع اتصالات (keep-alive)
+#   - إعادة المحاولة بتأخير أسي عشوائي (jitter) واحترام Retry-After
+#   - جلب عدة أشهر/مدن بالتوازي
+#   - طلبات مشروطة (If-None-Match / If-Modified-Since) حتى لا يُعاد تنزيل شهر لم يتغير،
+#     والـ ETag/Last-Modified تُحفظ مع مخزن الأشهر فيبقى أول طلب بعد إعادة التشغيل مشروطًا
+import os
+import json
+import random
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+from prayer_data import VALID_PRAYERS
+
+CALENDAR_API_URL = "http://api.aladhan.com/v1/calendar/{year}/{month}"
+FETCH_TIMEOUT = (3.05, 10)      # (الاتصال، القراءة) بالثواني
+FETCH_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+FETCH_WORKERS = 6
+RETRY_STATUS = {429, 500, 502, 503, 504}
+VALIDATORS_FILE = "fetch_validators.json"
+
+
+class FetchError(Exception):
+    pass
+
+
+def parse_calendar(data):
+    days = {}
+    for entry in data.get("data", []):
+        d, m, y = entry["date"]["gregorian"]["date"].split("-")
+        clean_timings = {}
+        for k, v in entry.get("timings", {}).items():
+            if k in VALID_PRAYERS:
+                clean_timings[k] = v.split(" ")[0]
+        days[f"{y}-{m}-{d}"] = clean_timings
+    return days
+
+
+class TimingsFetcher:
+    def __init__(self, url=CALENDAR_API_URL, workers=FETCH_WORKERS, retries=FETCH_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX, timeout=FETCH_TIMEOUT, cache_dir=None):
+        # cache_dir: مجلد مخزن الأشهر (timetable) لحفظ بيانات الطلبات المشروطة، أو None للذاكرة فقط
+        self.url = url
+        self.workers = workers
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.stats = {"requests": 0, "retries": 0, "not_modified": 0, "failures": 0}
+        self._session = None
+        self.cache_dir = cache_dir
+        self._validators = {}   # المفتاح -> (ETag, Last-Modified, الأيام)
+        self._validators_loaded = cache_dir is None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                self._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers, max_retries=0)
+                self._session.mount("http://", adapter)
+                self._session.mount("https://", adapter)
+            return self._session
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def _load_validators(self):
+        # يُستدعى والقفل محجوز، مرة واحدة عند أول طلب
+        if self._validators_loaded:
+            return
+        self._validators_loaded = True
+        try:
+            with open(os.path.join(self.cache_dir, VALIDATORS_FILE), encoding="utf-8") as f:
+                for entry in json.load(f):
+                    self._validators[tuple(entry["key"])] = (entry.get("etag"), entry.get("last_modified"), entry["days"])
+        except Exception:
+            pass
+
+    def _save_validators(self):
+        # يُستدعى والقفل محجوز. الأشهر المنتهية تُحذف كما يحذفها TimetableStore.evict_stale
+        if not self.cache_dir:
+            return
+        today = date.today()
+        for key in [k for k in self._validators if (k[-2], k[-1]) < (today.year, today.month)]:
+            del self._validators[key]
+        entries = [{"key": list(key), "etag": etag, "last_modified": last_modified, "days": days}
+                   for key, (etag, last_modified, days) in self._validators.items()]
+        path = os.path.join(self.cache_dir, VALIDATORS_FILE)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            delay = min(self.backoff_max, retry_after)
+        else:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        # الانتظار يُقطع فورًا عند إغلاق البرنامج
+        return not self._closed.wait(delay)
+
+    def fetch_month(self, lat, lng, method, timezone, year, month):
+        import requests
+
+        url = self.url.format(year=year, month=month)
+        params = {"latitude": lat, "longitude": lng, "method": method, "timezonestring": timezone}
+        key = (url, lat, lng, method, timezone, year, month)
+        with self._lock:
+            self._load_validators()
+            cached = self._validators.get(key)
+        headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retries")
+            self._count("requests")
+            try:
+                r = self.session().get(url, params=params, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                last_error = e
+                if attempt < self.retries and self._backoff(attempt):
+                    continue
+                break
+
+            if r.status_code == 304 and cached:
+                self._count("not_modified")
+                return cached[2]
+            if r.status_code == 200:
+                days = parse_calendar(r.json())
+                with self._lock:
+                    self._validators[key] = (r.headers.get("ETag"), r.headers.get("Last-Modified"), days)
+                    self._save_validators()
+                return days
+
+            last_error = FetchError(f"HTTP {r.status_code}")
+            if r.status_code not in RETRY_STATUS or attempt >= self.retries:
+                break
+            retry_after = r.headers.get("Retry-After")
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            if not self._backoff(attempt, retry_after):
+                break
+
+        self._count("failures")
+        raise FetchError(f"فشل جلب {year}-{month:02d}: {last_error}")
+
+    def fetch_many(self, jobs):
+        # jobs: [(lat, lng, method, timezone, year, month), ...]
+        # النتيجة بنفس الترتيب: الأيام أو None عند الفشل
+        def run(job):
+            try:
+                return self.fetch_month(*job)
+            except Exception:
+                return None
+
+        if len(jobs) <= 1:
+            return [run(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+            return list(pool.map(run, jobs))
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# قياس توقيت المسار الحرج: لكل أذان نسجل الموعد المطلوب، ووقت استيقاظ المجدول، ووقت رجوع play()،
+# ووقت خروج أول صوت من الجهاز، بالإضافة إلى زمن ونتيجة تحديث المواقيت.
+# التصدير بصيغة Prometheus النصية أو JSON (GET /metrics في وضع الخدمة، أو ملف "metrics_file" في الإعدادات).
+import os
+import json
+import time
+import threading
+from collections import deque
+
+PRAYER_HISTORY = 100    # عدد آخر مرات الأذان المحفوظة بالتفصيل
+
+HELP = {
+    "adhan_prayers_fired_total": ("counter", "عدد مرات تشغيل الأذان في موعده"),
+    "adhan_prayers_missed_total": ("counter", "عدد المواعيد التي فاتت (سكون الجهاز مثلًا)"),
+    "adhan_timings_updates_total": ("counter", "عدد مرات تحديث المواقيت حسب النتيجة"),
+    "adhan_timings_update_seconds": ("summary", "زمن تحديث المواقيت"),
+    "adhan_fetch_events_total": ("counter", "عدادات جلب المواقيت من الإنترنت"),
+    "adhan_wake_delay_seconds": ("gauge", "تأخر استيقاظ المجدول عن الموعد في آخر أذان"),
+    "adhan_play_return_seconds": ("gauge", "زمن رجوع play() بعد الموعد في آخر أذان"),
+    "adhan_first_audio_seconds": ("gauge", "زمن خروج أول صوت بعد الموعد في آخر أذان"),
+    "adhan_max_wake_delay_seconds": ("gauge", "أكبر تأخر استيقاظ منذ بدء التشغيل"),
+    "adhan_uptime_seconds": ("gauge", "مدة تشغيل البرنامج"),
+    "adhan_clock_jumps_total": ("counter", "عدد مرات تغيير ساعة النظام أثناء التشغيل"),
+    "adhan_prerolls_total": ("counter", "عدد مرات تجهيز جهاز الصوت قبل الموعد"),
+}
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in sorted(labels.items()):
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Metrics:
+    def __init__(self, history=PRAYER_HISTORY):
+        self.started = time.time()
+        self.prayers = deque(maxlen=history)
+        self._counters = {}     # (الاسم، الوسوم) -> القيمة
+        self._gauges = {}
+        self._summaries = {}    # (الاسم، الوسوم) -> [المجموع، العدد]
+        self._lock = threading.Lock()
+        self.sources = []       # دوال ترجع [(الاسم، الوسوم، القيمة)] لعدادات خارجية مثل TimingsFetcher.stats
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            entry = self._summaries.setdefault(key, [0.0, 0])
+            entry[0] += value
+            entry[1] += 1
+
+    def prayer_fired(self, prayer, target, wake, play_return, site=""):
+        # كل الأوقات طوابع time.time()؛ أول صوت يُضاف لاحقًا عبر prayer_audio()
+        record = {
+            "prayer": prayer,
+            "site": site,
+            "target": target,
+            "wake": wake,
+            "play_return": play_return,
+            "first_audio": None,
+            "wake_delay": wake - target,
+            "play_delay": play_return - target,
+            "audio_delay": None,
+        }
+        labels = (("prayer", prayer), ("site", site))
+        with self._lock:
+            self.prayers.append(record)
+            fired = ("adhan_prayers_fired_total", labels)
+            self._counters[fired] = self._counters.get(fired, 0) + 1
+            self._gauges[("adhan_wake_delay_seconds", labels)] = record["wake_delay"]
+            self._gauges[("adhan_play_return_seconds", labels)] = record["play_delay"]
+            worst = self._gauges.get(("adhan_max_wake_delay_seconds", ()), 0.0)
+            self._gauges[("adhan_max_wake_delay_seconds", ())] = max(worst, record["wake_delay"])
+        return record
+
+    def prayer_audio(self, record, first_audio):
+        if first_audio is None:
+            return
+        with self._lock:
+            record["first_audio"] = first_audio
+            record["audio_delay"] = first_audio - record["target"]
+            labels = (("prayer", record["prayer"]), ("site", record["site"]))
+            self._gauges[("adhan_first_audio_seconds", labels)] = record["audio_delay"]
+
+    def prayer_missed(self, prayer, site=""):
+        self.inc("adhan_prayers_missed_total", prayer=prayer, site=site)
+
+    def _collect(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            summaries = {k: list(v) for k, v in self._summaries.items()}
+        for source in self.sources:
+            try:
+                for name, labels, value in source():
+                    counters[(name, tuple(sorted(labels.items())))] = value
+            except Exception:
+                pass
+        return counters, gauges, summaries
+
+    def to_prometheus(self):
+        counters, gauges, summaries = self._collect()
+        series = {}
+        for (name, labels), value in counters.items():
+            series.setdefault(name, []).append((name, labels, value))
+        for (name, labels), value in gauges.items():
+            series.setdefault(name, []).append((name, labels, value))
+        for (name, labels), (total, count) in summaries.items():
+            series.setdefault(name, []).append((name + "_sum", labels, total))
+            series[name].append((name + "_count", labels, count))
+        series["adhan_uptime_seconds"] = [("adhan_uptime_seconds", (), round(time.time() - self.started))]
+
+        lines = []
+        for name in sorted(series):
+            kind, help_text = HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for metric, labels, value in sorted(series[name], key=lambda s: (s[0], s[1])):
+                lines.append(f"{metric}{_labels(dict(labels))} {value:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        counters, gauges, summaries = self._collect()
+
+        def flat(items):
+            return [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(items.items())]
+
+        with self._lock:
+            prayers = [dict(r) for r in self.prayers]
+        return {
+            "uptime": round(time.time() - self.started, 1),
+            "counters": flat(counters),
+            "gauges": flat(gauges),
+            "summaries": [{"name": name, "labels": dict(labels), "sum": total, "count": count}
+                          for (name, labels), (total, count) in sorted(summaries.items())],
+            "prayers": prayers,
+        }
+
+    def write(self, path):
+        # ملف بصيغة Prometheus (مناسب لـ node_exporter textfile) أو JSON حسب الامتداد
+        if path.endswith(".json"):
+            data = json.dumps(self.to_json(), ensure_ascii=False, indent=2)
+        else:
+            data = self.to_prometheus()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+# فهرس أماكن بدون إنترنت (مبني من ملف GeoNames مثل cities15000.txt) بدل قاموس المدن الثابت:
+#   - بحث بأول الاسم أو بأجزاء منه (trigram) بالعربية واللاتينية
+#   - أقرب مدينة لإحداثيات معينة (شبكة درجة × درجة)
+#   - المنطقة الزمنية IANA وطريقة الحساب الافتراضية لكل مكان
+# الملف يُقرأ عبر mmap عند أول بحث فقط، ولا يُحمَّل في الذاكرة كاملًا.
+# البناء: python places.py build cities15000.txt [--out places.idx]
+# التجربة: python places.py search "الرياض" | python places.py nearest 21.42 39.82
+import os
+import re
+import sys
+import mmap
+import math
+import array
+import struct
+import zlib
+import argparse
+import threading
+import unicodedata
+
+from prayer_data import CITIES, TIMEZONE_MAPPING, METHOD_MAPPING
+
+PLACES_FILE = "places.idx"
+PLACES_MAGIC = b"ADPL"
+PLACES_VERSION = 1
+# magic, version, عدد المناطق، عدد الأماكن، عدد المفاتيح، عدد الـ trigrams، ثم إزاحات الأقسام
+HEADER = struct.Struct("<4sHHIIIIIIIIII")
+RECORD = struct.Struct("<ffIIIHHHB2s")    # lat, lng, السكان، إزاحة/طول الاسم العربي واللاتيني، المنطقة، الطريقة، الدولة
+KEY = struct.Struct("<IHI")               # إزاحة/طول الاسم المُوحَّد، رقم المكان
+TRIGRAM = struct.Struct("<III")           # crc32 للـ trigram، أول رقم في القائمة، العدد
+GRID_COLS = 360
+GRID_CELLS = 180 * GRID_COLS
+EARTH_KM = 6371.0
+MAX_KEYS_PER_PLACE = 8
+
+# طريقة الحساب الافتراضية حسب الدولة (نفس أرقام aladhan.com)، والباقي ISNA
+COUNTRY_METHODS = {
+    "SA": 4, "AE": 4, "QA": 4, "KW": 4, "OM": 4, "BH": 4, "YE": 4,
+    "EG": 5, "SD": 5, "IQ": 5, "LB": 5, "SY": 5, "JO": 5, "PS": 5, "LY": 5,
+    "TR": 13,
+}
+DEFAULT_METHOD = 2
+
+ARABIC_LETTERS = re.compile("[؀-ۿ]")
+NOT_WORD = re.compile(r"[^\w]+")
+ARABIC_FOLD = str.maketrans({"ة": "ه", "ى": "ي", "ـ": None})
+
+
+def normalize(text):
+    # توحيد الأسماء للبحث: حروف صغيرة، بدون تشكيل أو علامات، والألف/الهمزات والتاء المربوطة موحّدة
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c)).translate(ARABIC_FOLD)
+    return NOT_WORD.sub(" ", text).strip()
+
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def cell_of(lat, lng):
+    row = min(179, max(0, int(math.floor(lat)) + 90))
+    col = min(GRID_COLS - 1, max(0, int(math.floor(lng)) + 180))
+    return row * GRID_COLS + col
+
+
+def distance_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class Place:
+    __slots__ = ("name", "name_en", "lat", "lng", "timezone", "method", "country", "population")
+
+    def __init__(self, name, lat, lng, timezone, method, name_en="", country="", population=0):
+        self.name = name
+        self.name_en = name_en
+        self.lat = lat
+        self.lng = lng
+        self.timezone = timezone
+        self.method = method
+        self.country = country
+        self.population = population
+
+    @property
+    def label(self):
+        # الاسم المعروض في القائمة والمحفوظ في config.json
+        return f"{self.name} ({self.country})" if self.country else self.name
+
+    def to_config(self):
+        return {"name": self.label, "lat": self.lat, "lng": self.lng, "timezone": self.timezone, "method": self.method}
+
+    @classmethod
+    def from_config(cls, entry):
+        return cls(entry["name"], float(entry["lat"]), float(entry["lng"]), entry["timezone"], int(entry["method"]))
+
+    def __repr__(self):
+        return f"Place({self.label!r}, {self.lat:.4f}, {self.lng:.4f}, {self.timezone}, method={self.method})"
+
+
+def builtin_place(city):
+    if city not in CITIES:
+        return None
+    lat, lng = CITIES[city]
+    return Place(city, lat, lng, TIMEZONE_MAPPING.get(city, "UTC"), METHOD_MAPPING.get(city, DEFAULT_METHOD))
+
+
+def build_index(places):
+    # places: [(الاسم العربي، الاسم اللاتيني، [أسماء أخرى]، lat، lng، السكان، المنطقة، الطريقة، الدولة)]
+    places = sorted(places, key=lambda p: (cell_of(p[3], p[4]), -p[5]))
+    strings = bytearray()
+    string_offsets = {}
+
+    def add_string(text):
+        raw = text.encode("utf-8")
+        if raw not in string_offsets:
+            string_offsets[raw] = len(strings)
+            strings.extend(raw)
+        return string_offsets[raw], len(raw)
+
+    zones = []
+    zone_ids = {}
+    records = bytearray()
+    keys = []
+    grams = {}
+    cells = array.array("I", [0] * (GRID_CELLS + 1))
+    for i, (name_ar, name_en, alternates, lat, lng, population, zone, method, country) in enumerate(places):
+        if zone not in zone_ids:
+            zone_ids[zone] = len(zones)
+            zones.append(zone)
+        ar_off, ar_len = add_string(name_ar)
+        en_off, en_len = add_string(name_en)
+        records += RECORD.pack(lat, lng, population, ar_off, en_off, ar_len, en_len, zone_ids[zone], method,
+                               country.encode("ascii", "replace")[:2].ljust(2))
+        cells[cell_of(lat, lng) + 1] += 1
+
+        names = []
+        for name in [name_ar, name_en] + list(alternates):
+            key = normalize(name)
+            if key and key not in names:
+                names.append(key)
+        for key in names[:MAX_KEYS_PER_PLACE]:
+            keys.append((key.encode("utf-8"), i))
+        for key in names[:2]:
+            for gram in trigrams(key):
+                grams.setdefault(zlib.crc32(gram.encode("utf-8")), set()).add(i)
+
+    for c in range(GRID_CELLS):
+        cells[c + 1] += cells[c]
+
+    keys.sort()
+    key_table = bytearray()
+    for raw, i in keys:
+        if raw not in string_offsets:
+            string_offsets[raw] = len(strings)
+            strings.extend(raw)
+        key_table += KEY.pack(string_offsets[raw], len(raw), i)
+
+    gram_table = bytearray()
+    postings = array.array("I")
+    for h in sorted(grams):
+        ids = sorted(grams[h])
+        gram_table += TRIGRAM.pack(h, len(postings), len(ids))
+        postings.extend(ids)
+
+    zone_blob = "\n".join(zones).encode("utf-8")
+    offset = HEADER.size
+    sections = []
+    for blob in (strings, records, key_table, gram_table, postings.tobytes(), cells.tobytes(), zone_blob):
+        sections.append(offset)
+        offset += len(blob)
+    header = HEADER.pack(PLACES_MAGIC, PLACES_VERSION, len(zones), len(places), len(keys), len(grams), *sections)
+    return b"".join([header, bytes(strings), bytes(records), bytes(key_table), bytes(gram_table),
+                     postings.tobytes(), cells.tobytes(), zone_blob])
+
+
+def builtin_index_data():
+    # عند عدم وجود places.idx: فهرس صغير من مدن prayer_data فقط
+    places = []
+    for city, (lat, lng) in CITIES.items():
+        places.append((city, "", [], lat, lng, 0, TIMEZONE_MAPPING.get(city, "UTC"),
+                       METHOD_MAPPING.get(city, DEFAULT_METHOD), ""))
+    return build_index(places)
+
+
+def read_geonames(path, min_population=0):
+    # صيغة GeoNames: geonameid, name, asciiname, alternatenames, lat, lng, class, code, country, ... population(14), ... timezone(17)
+    places = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 18 or cols[6] != "P":
+                continue
+            try:
+                lat, lng = float(cols[4]), float(cols[5])
+                population = int(cols[14] or 0)
+            except ValueError:
+                continue
+            if population < min_population or not cols[17]:
+                continue
+            alternates = [a for a in cols[3].split(",") if a]
+            arabic = [a for a in alternates if ARABIC_LETTERS.search(a)]
+            name_ar = arabic[0] if arabic else cols[1]
+            country = cols[8]
+            others = arabic[1:3] + [cols[2]] + [a for a in alternates if a.isascii()][:3]
+            places.append((name_ar, cols[1], others, lat, lng, population, cols[17],
+                           COUNTRY_METHODS.get(country, DEFAULT_METHOD), country))
+    return places
+
+
+class PlaceIndex:
+    def __init__(self, path=None, data=None):
+        self.path = path
+        self._data = data
+        self._file = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._map is not None:
+                return self._map
+            if self._data is None:
+                self._file = open(self.path, "rb")
+                buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buf = memoryview(self._data)
+            (magic, version, zone_count, self.count, self.key_count, self.gram_count,
+             self.strings_off, self.records_off, self.keys_off, self.grams_off,
+             self.postings_off, self.cells_off, zones_off) = HEADER.unpack_from(buf, 0)
+            if magic != PLACES_MAGIC or version != PLACES_VERSION:
+                raise ValueError(f"فهرس أماكن غير معروف: {self.path}")
+            self.zones = bytes(buf[zones_off:]).decode("utf-8").split("\n")
+            self._map = buf
+            return buf
+
+    def close(self):
+        with self._lock:
+            if isinstance(self._map, mmap.mmap):
+                self._map.close()
+            self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _string(self, off, length):
+        start = self.strings_off + off
+        return bytes(self._map[start:start + length]).decode("utf-8")
+
+    def place(self, i):
+        buf = self._load()
+        lat, lng, population, ar_off, en_off, ar_len, en_len, zone, method, country = \
+            RECORD.unpack_from(buf, self.records_off + i * RECORD.size)
+        return Place(self._string(ar_off, ar_len), round(lat, 4), round(lng, 4), self.zones[zone], method,
+                     self._string(en_off, en_len), country.decode("ascii").strip(), population)
+
+    def _population(self, i):
+        return struct.unpack_from("<I", self._map, self.records_off + i * RECORD.size + 8)[0]
+
+    def _key(self, k):
+        off, length, i = KEY.unpack_from(self._map, self.keys_off + k * KEY.size)
+        start = self.strings_off + off
+        return bytes(self._map[start:start + length]), i
+
+    def _prefix(self, prefix, limit):
+        # بحث ثنائي في المفاتيح المرتبة ثم المرور على كل ما يبدأ بنفس الحروف
+        lo, hi = 0, self.key_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid)[0] < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = {}
+        k = lo
+        while k < self.key_count and len(found) < limit:
+            key, i = self._key(k)
+            if not key.startswith(prefix):
+                break
+            found.setdefault(i, key == prefix)
+            k += 1
+        return found
+
+    def _postings(self, gram):
+        h = zlib.crc32(gram.encode("utf-8"))
+        lo, hi = 0, self.gram_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value, start, count = TRIGRAM.unpack_from(self._map, self.grams_off + mid * TRIGRAM.size)
+            if value == h:
+                ids = array.array("I")
+                begin = self.postings_off + start * 4
+                ids.frombytes(self._map[begin:begin + count * 4])
+                return ids
+            if value < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        return ()
+
+    def search(self, query, limit=20):
+        self._load()
+        q = normalize(query)
+        if not q:
+            return []
+        # 1) الأسماء التي تبدأ بالنص (المطابق تمامًا أولًا ثم الأكثر سكانًا)
+        found = self._prefix(q.encode("utf-8"), limit * 20)
+        ranked = sorted(found, key=lambda i: (not found[i], -self._population(i)))[:limit]
+        # 2) تكملة بالتشابه في أجزاء الاسم (أخطاء إملائية، أو نص من وسط الاسم)
+        if len(ranked) < limit and len(q) >= 3:
+            grams = trigrams(q)
+            hits = {}
+            for gram in grams:
+                for i in self._postings(gram):
+                    hits[i] = hits.get(i, 0) + 1
+            needed = max(2, int(len(grams) * 0.6))
+            extra = [i for i, n in hits.items() if n >= needed and i not in found]
+            extra.sort(key=lambda i: (-hits[i], -self._population(i)))
+            ranked += extra[:limit - len(ranked)]
+        return [self.place(i) for i in ranked]
+
+    def get(self, label):
+        # من الاسم المعروض "الاسم (الدولة)" إلى المكان نفسه
+        match = re.match(r"^(.*) \(([A-Z]{2})\)$", label)
+        name, country = (match.group(1), match.group(2)) if match else (label, "")
+        self._load()
+        key = normalize(name).encode("utf-8")
+        candidates = [i for i, exact in self._prefix(key, 200).items() if exact]
+        places = [self.place(i) for i in candidates]
+        places = [p for p in places if p.country == country and name in (p.name, p.name_en)] or \
+                 [p for p in places if p.country == country]
+        if not places:
+            return None
+        return max(places, key=lambda p: p.population)
+
+    def nearest(self, lat, lng):
+        # البحث في حلقات من الخلايا حول النقطة حتى لا يمكن وجود مكان أقرب خارجها
+        buf = self._load()
+        if not self.count:
+            return None
+        row0, col0 = divmod(cell_of(lat, lng), GRID_COLS)
+        best, best_km = None, float("inf")
+        for r in range(0, 181):
+            for row in range(row0 - r, row0 + r + 1):
+                if not 0 <= row < 180:
+                    continue
+                ring_cols = range(col0 - r, col0 + r + 1) if abs(row - row0) == r else (col0 - r, col0 + r)
+                for col in set(c % GRID_COLS for c in ring_cols):
+                    cell = row * GRID_COLS + col
+                    start, end = struct.unpack_from("<II", buf, self.cells_off + cell * 4)
+                    for i in range(start, end):
+                        p_lat, p_lng = struct.unpack_from("<ff", buf, self.records_off + i * RECORD.size)
+                        d = distance_km(lat, lng, p_lat, p_lng)
+                        if d < best_km:
+                            best, best_km = i, d
+            # أقرب مسافة ممكنة لأي خلية خارج الحلقة الحالية
+            bound = r * 111.195 * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + r + 1))))
+            if best is not None and best_km <= bound:
+                break
+        return self.place(best), best_km
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    # الفهرس المرفق مع البرنامج (places.idx) أو فهرس المدن المدمجة إذا لم يوجد
+    global _index
+    with _index_lock:
+        if _index is None:
+            from player import resource_path
+            path = resource_path(PLACES_FILE)
+            _index = PlaceIndex(path) if os.path.exists(path) else PlaceIndex(data=builtin_index_data())
+        return _index
+
+
+def find_place(label):
+    return builtin_place(label) or get_index().get(label)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="فهرس الأماكن")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build")
+    p.add_argument("source", help="ملف GeoNames (cities500/1000/5000/15000.txt)")
+    p.add_argument("--out", default=PLACES_FILE)
+    p.add_argument("--min-population", type=int, default=0)
+    p = sub.add_parser("search")
+    p.add_argument("query")
+    p.add_argument("--limit", type=int, default=10)
+    p = sub.add_parser("nearest")
+    p.add_argument("lat", type=float)
+    p.add_argument("lng", type=float)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        places = read_geonames(args.source, args.min_population)
+        data = build_index(places)
+        with open(args.out + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(args.out + ".tmp", args.out)
+        print(f"{args.out}: {len(places)} مكان، {len(data) // 1024} KB")
+        return 0
+
+    index = get_index()
+    if args.command == "search":
+        for place in index.search(args.query, args.limit):
+            print(place)
+    else:
+        place, km = index.nearest(args.lat, args.lng)
+        print(f"{place} على بعد {km:.1f} كم")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
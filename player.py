@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import threading
+
+import audio_cache
+
+# pygame وsounddevice يتم استيرادهما عند أول استخدام فقط لتسريع بدء التشغيل
+
+ADHAN_FILES = ["adhan1.mp3", "adhan2.mp3"]
+NO_OUTPUT_DEVICE = "لا يوجد أجهزة إخراج"
+AUDIO_BACKENDS = ["auto", "sounddevice", "pygame"]
+PLAYBACK_FORMAT = (44100, -16, 2)   # صيغة PCM المخزنة في audio_cache لمسار sounddevice
+PREROLL_BUFFER_SECONDS = 5          # ثوانٍ من أول الأذان تُحمَّل في الذاكرة قبل الموعد
+PREROLL_MAX_AGE = 90                # تجهيز لم يُستخدم خلال هذه المدة يُلغى ويُغلق الجهاز (تُطبقها الخدمة)
+
+
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+_output_devices = None
+
+
+def print_log(message, **fields):
+    print(message)
+
+
+def get_output_devices(refresh=False, log=print_log):
+    # فحص أجهزة الصوت (sd.query_devices) مرة واحدة فقط في كل تشغيل
+    # log(message, **fields): سجل الأحداث (EventLog.emit) حتى تصل الأخطاء للواجهة وملف السجل
+    global _output_devices
+    if _output_devices is None or refresh:
+        try:
+            import sounddevice as sd
+        except (ImportError, OSError) as e:
+            # بدون PortAudio لا يمكن اختيار جهاز، ويعمل الصوت عبر pygame على الجهاز الافتراضي
+            log(f"تعذر فحص أجهزة الصوت: {e}", level="warning", event="audio_devices_failed")
+            _output_devices = [NO_OUTPUT_DEVICE]
+            return _output_devices
+        found = None
+        if refresh:
+            # إعادة فحص حقيقية: أجهزة وُصلت أو فُصلت بعد بدء البرنامج
+            try:
+                import audio_stream
+                found = audio_stream.rescan_devices(log)
+            except Exception:
+                found = None
+        devices = []
+        try:
+            for idx, dev in enumerate(found if found is not None else sd.query_devices()):
+                if dev['max_output_channels'] > 0:
+                    devices.append(f"{idx} - {dev['name']}")
+        except Exception as e:
+            log(f"تعذر فحص أجهزة الصوت: {e}", level="warning", event="audio_devices_failed")
+        _output_devices = devices if devices else [NO_OUTPUT_DEVICE]
+    return _output_devices
+
+
+def resolve_device(device, devices):
+    # "3 - USB Speakers" قد يتغير رقمه بعد إعادة التوصيل: البحث بالاسم، و"" (الافتراضي) إذا اختفى
+    if device in (None, "", NO_OUTPUT_DEVICE) or device in devices:
+        return device
+    name = str(device).split(" - ", 1)[-1]
+    for candidate in devices:
+        if candidate.split(" - ", 1)[-1] == name:
+            return candidate
+    return ""
+
+
+class AdhanPlayer:
+    def __init__(self, adhan_file="adhan1.mp3", volume=0.8, output_device=None, extra_devices=None,
+                 backend="auto", block_size=None, fade_in=0.0, fade_out=0.0, log=print_log):
+        # تهيئة الصوت وتجهيز ملف الأذان مؤجلان إلى preload() أو أول تشغيل
+        # backend: "sounddevice" يوجّه الصوت للجهاز المختار، و"pygame" يستخدم الجهاز الافتراضي فقط
+        self.volume = volume
+        self.sound_file = resource_path(adhan_file)
+        self.output_device = output_device
+        self.extra_devices = list(extra_devices or [])
+        self.backend = backend
+        self.block_size = block_size
+        self.fade_in = fade_in
+        self.fade_out = fade_out
+        self.log = log
+        self.audio = None
+        self.current = None     # PlaybackHandle للتشغيل الحالي
+        self.prepared = None    # PlaybackHandle جاهز قبل الموعد (prepare)
+        self._stream_ok = None
+        self._lock = threading.Lock()
+        self._prepared_lock = threading.Lock()
+
+    def set_backend(self, backend):
+        if backend == self.backend:
+            return
+        self.stop()
+        self.discard_prepared()
+        with self._lock:
+            self.backend = backend
+            self._stream_ok = None
+            if self.audio is not None:
+                self.audio.close()
+            self.audio = None
+
+    def uses_stream(self):
+        if self._stream_ok is None:
+            if self.backend == "pygame":
+                self._stream_ok = False
+            else:
+                try:
+                    import audio_stream
+                    self._stream_ok = True
+                except Exception as e:
+                    if self.backend == "sounddevice":
+                        raise
+                    self.log(f"تعذر استخدام sounddevice، سيتم استخدام pygame: {e}",
+                             level="warning", event="audio_backend_fallback")
+                    self._stream_ok = False
+        return self._stream_ok
+
+    def preload(self):
+        # الصوت المفكوك يُقرأ من audio_cache عبر mmap بدل فك MP3 كاملًا في الذاكرة
+        with self._lock:
+            if self.audio is None:
+                if self.uses_stream():
+                    mixer_format = PLAYBACK_FORMAT
+                else:
+                    import pygame
+                    if not pygame.mixer.get_init():
+                        pygame.mixer.init()
+                    mixer_format = pygame.mixer.get_init()
+                self.audio = audio_cache.load(self.sound_file, mixer_format)
+            return self.audio
+
+    @property
+    def output_devices(self):
+        devices = [self.output_device] + [d for d in self.extra_devices if d != self.output_device]
+        return [None if d in (None, "", NO_OUTPUT_DEVICE) else d for d in devices]
+
+    @property
+    def is_playing(self):
+        return self.current is not None and self.current.active
+
+    @property
+    def last_latency(self):
+        return None if self.current is None else self.current.latency
+
+    @property
+    def first_audio_time(self):
+        return None if self.current is None else self.current.first_audio_time
+
+    def play(self, duration=None, loop=False, fade_out=None):
+        # duration: عدد الثواني التي ستُشغَّل (مع loop يُكرر الملف حتى تكتمل المدة)، وبدونها يُشغَّل الملف مرة واحدة
+        # الإيقاف عند نهاية المدة يتم داخل محرك الصوت نفسه، والنتيجة PlaybackHandle يمكن إلغاؤه
+        self.stop()
+        handle = self.take_prepared(duration, loop, fade_out)
+        if handle is not None:
+            # الجهاز مفتوح ويعمل بصمت منذ prepare(): لا يبقى إلا بدء الصوت
+            handle.begin()
+            handle.set_volume(self.volume)
+            for playback in handle.streams:
+                playback.release()
+            if handle.sound is not None:
+                self._start_pygame(handle)
+            self.current = handle
+            return handle
+        audio = self.preload()
+        handle = PlaybackHandle(audio, duration, loop, self.fade_out if fade_out is None else fade_out)
+        if self.uses_stream():
+            try:
+                self._play_stream(handle, audio)
+            except Exception as e:
+                # الجهاز اختفى منذ آخر فحص (سماعات USB مثلًا): إعادة الفحص والمحاولة مرة واحدة
+                self.log(f"خطأ في فتح جهاز الصوت، إعادة المحاولة بعد فحص الأجهزة: {e}",
+                         level="warning", event="audio_device_retry", device=self.output_device)
+                handle.close()
+                self.check_device()
+                handle = PlaybackHandle(audio, duration, loop, self.fade_out if fade_out is None else fade_out)
+                self._play_stream(handle, audio)
+        else:
+            self._play_pygame(handle, audio)
+        self.current = handle
+        return handle
+
+    def check_device(self):
+        # قبل الموعد: الجهاز المختار قد يكون فُصل أو تغير رقمه، والجهاز نفسه قد دخل وضع توفير الطاقة.
+        # يرجع [(الجهاز القديم، الجديد)] للأجهزة التي تغيرت ("" = الافتراضي)
+        if not self.uses_stream():
+            self._reopen_mixer()
+            return []
+        devices = get_output_devices(refresh=True, log=self.log)
+        changes = []
+        device = resolve_device(self.output_device, devices)
+        if device != self.output_device:
+            changes.append((self.output_device, device))
+            self.output_device = device
+        extras = []
+        for extra in self.extra_devices:
+            device = resolve_device(extra, devices)
+            if device != extra:
+                changes.append((extra, device))
+            if device:
+                extras.append(device)
+        self.extra_devices = extras
+        return changes
+
+    def _reopen_mixer(self):
+        # إعادة فتح mixer تلتقط الجهاز الافتراضي الحالي (بعد فصل سماعات مثلًا)، لكن ليس أثناء تشغيل أي صوت
+        import pygame
+        mixer_format = pygame.mixer.get_init()
+        if mixer_format and pygame.mixer.get_busy():
+            return
+        pygame.mixer.quit()
+        if mixer_format:
+            pygame.mixer.init(*mixer_format)
+        else:
+            pygame.mixer.init()
+
+    def prepare(self, duration=None, loop=False, fade_out=None, check=True):
+        # pre-roll قبل الموعد بقليل: فحص الجهاز، تحميل أول الأذان في الذاكرة، وفتح الجهاز بصمت
+        # حتى يخرج من وضع توفير الطاقة. play() بنفس المعاملات يستخدم هذا التجهيز مباشرة،
+        # وإلا يجب إغلاقه بـ discard_prepared(handle) بعد PREROLL_MAX_AGE
+        if self.is_playing:
+            return []
+        self.discard_prepared()
+        changes = self.check_device() if check else []
+        audio = self.preload()
+        audio.warm(PREROLL_BUFFER_SECONDS)
+        handle = PlaybackHandle(audio, duration, loop, self.fade_out if fade_out is None else fade_out)
+        handle.key = self.prepare_key(duration, loop, fade_out)
+        if self.uses_stream():
+            self._play_stream(handle, audio, hold=True)
+        else:
+            self._prepare_pygame(handle, audio)
+        with self._prepared_lock:
+            self.prepared = handle
+        return changes
+
+    def prepare_key(self, duration, loop, fade_out):
+        return (duration, loop, fade_out, self.sound_file, tuple(self.output_devices), self.block_size,
+                self.fade_in, self.uses_stream())
+
+    def take_prepared(self, duration, loop, fade_out):
+        with self._prepared_lock:
+            handle, self.prepared = self.prepared, None
+        if handle is None:
+            return None
+        alive = all(p.stream.active and not p.finished.is_set() for p in handle.streams)
+        if alive and handle.key == self.prepare_key(duration, loop, fade_out):
+            return handle
+        handle.close()
+        return None
+
+    def discard_prepared(self, handle=None):
+        with self._prepared_lock:
+            if handle is not None and self.prepared is not handle:
+                return
+            handle, self.prepared = self.prepared, None
+        if handle is not None:
+            handle.close()
+
+    def _play_stream(self, handle, audio, hold=False):
+        import audio_stream
+        kwargs = {} if self.block_size is None else {"block_size": self.block_size}
+        for device in self.output_devices:
+            playback = audio_stream.StreamPlayback(
+                audio, device=device, volume=self.volume, duration=handle.duration, loop=handle.loop,
+                fade_in=self.fade_in, fade_out=handle.fade_out, hold=hold, **kwargs
+            )
+            handle.streams.append(playback)
+        for playback in handle.streams:
+            playback.start()
+
+    def _prepare_pygame(self, handle, audio):
+        import pygame
+        self._build_sound(handle, audio)
+        # صمت متكرر حتى الموعد يبقي جهاز الصوت مستيقظًا
+        handle.silence = pygame.mixer.Sound(buffer=bytes(audio.frame_bytes * (audio.frequency // 10)))
+        handle.silence_channel = handle.silence.play(-1)
+
+    def _play_pygame(self, handle, audio):
+        self._build_sound(handle, audio)
+        self._start_pygame(handle)
+
+    def _start_pygame(self, handle):
+        if handle.silence_channel is not None:
+            handle.silence_channel.stop()
+        handle.sound.set_volume(self.volume)
+        handle.channel = handle.sound.play(handle.loops, maxtime=handle.maxtime, fade_ms=int(self.fade_in * 1000))
+        handle.first_audio = time.time()
+
+    def _build_sound(self, handle, audio):
+        import pygame
+        duration = handle.duration
+        pcm = audio.view(duration)
+        buffer = pcm
+        if duration is not None and handle.loop and duration > audio.duration:
+            # التكرار يُبنى كمقطع واحد بطول المدة حتى يقع التدرج في نهايتها كما في sounddevice
+            buffer = repeat_pcm(pcm, audio, duration)
+        if handle.fade_out:
+            # التدرج في النهاية يُطبق على نسخة من الجزء المطلوب فقط، فينتهي الصوت وحده بدون مؤقت
+            buffer = fade_tail(buffer, audio, handle.fade_out)
+        handle.sound = pygame.mixer.Sound(buffer=buffer)
+        pcm.release()
+        handle.loops = 0
+        handle.maxtime = int(duration * 1000) if duration is not None else 0
+
+    def stop(self, fade=False):
+        handle = self.current
+        if handle is None:
+            return
+        handle.cancel(fade=fade)
+        if not fade:
+            handle.close()
+            self.current = None
+
+    def set_volume(self, v):
+        self.volume = max(0, min(1, v))
+        if self.current is not None:
+            self.current.set_volume(self.volume)
+
+    def change_sound(self, new_file):
+        was_playing = self.is_playing
+        self.stop()
+        self.discard_prepared()
+        loaded = self.audio is not None
+        with self._lock:
+            self.sound_file = resource_path(new_file)
+            if self.audio is not None:
+                self.audio.close()
+            self.audio = None
+        if loaded:
+            self.preload()
+        if was_playing:
+            self.play()
+
+
+def repeat_pcm(pcm, audio, seconds):
+    import numpy as np
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, audio.channels)
+    return np.resize(samples, (int(seconds * audio.frequency), audio.channels))
+
+
+def fade_tail(pcm, audio, seconds):
+    import numpy as np
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, audio.channels).copy()
+    n = min(len(samples), int(seconds * audio.frequency))
+    if n:
+        ramp = np.linspace(1.0, 0.0, n, dtype=np.float32)[:, None]
+        samples[-n:] = (samples[-n:] * ramp).astype(np.int16)
+    return samples
+
+
+class PlaybackHandle:
+    # تشغيل واحد للأذان. ينتهي وحده عند نهاية الملف أو المدة، ويمكن إلغاؤه (مع تدرج أو فورًا)
+    # بدون أن يؤثر على تشغيل آخر بدأ بعده (مثل تشغيل يدوي أثناء أذان الصلاة)
+    def __init__(self, audio, duration, loop, fade_out):
+        self.duration = duration
+        self.loop = loop
+        self.fade_out = fade_out
+        self.audio_duration = audio.duration
+        self.begin()
+        self.streams = []
+        self.sound = None
+        self.channel = None
+        self.loops = 0
+        self.maxtime = 0
+        self.silence = None
+        self.silence_channel = None
+        self.key = None
+        self.first_audio = None
+        self.cancelled = False
+        self.closed = False
+
+    def begin(self):
+        # بداية الصوت الفعلية (للتجهيز المسبق تُعاد عند الموعد)
+        self.started = time.time()
+        self.ends_at = self.started + (self.duration if self.duration is not None else self.audio_duration)
+
+    def _owns_channel(self):
+        return self.channel is not None and self.channel.get_sound() is self.sound
+
+    @property
+    def active(self):
+        if self.cancelled:
+            return False
+        if self.streams:
+            return not all(s.finished.is_set() for s in self.streams)
+        return self._owns_channel() and self.channel.get_busy()
+
+    @property
+    def latency(self):
+        latencies = [s.latency for s in self.streams if s.latency is not None]
+        return max(latencies) if latencies else None
+
+    @property
+    def first_audio_time(self):
+        # مع sounddevice: وقت خروج أول عينة من أول جهاز، ومع pygame: وقت بدء القناة (تقريبي)
+        times = [s.first_audio for s in self.streams if s.first_audio is not None]
+        return min(times) if times else self.first_audio
+
+    def set_volume(self, volume):
+        for playback in self.streams:
+            playback.volume = volume
+        if self.sound is not None:
+            self.sound.set_volume(volume)
+
+    def cancel(self, fade=True):
+        if self.cancelled:
+            return
+        self.cancelled = True
+        fade_out = self.fade_out if fade else 0
+        for playback in self.streams:
+            if not playback.finished.is_set():
+                playback.stop(fade=bool(fade_out))
+        if self._owns_channel():
+            if fade_out:
+                self.channel.fadeout(int(fade_out * 1000))
+            else:
+                self.channel.stop()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.silence_channel is not None and self.silence_channel.get_sound() is self.silence:
+            self.silence_channel.stop()
+        for playback in self.streams:
+            if not playback.finished.is_set():
+                playback.stop(fade=False)
+            playback.close()
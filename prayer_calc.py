@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# حساب مواقيت الصلاة محليًا بدون إنترنت (نفس خوارزمية PrayTimes التي يعتمد عليها aladhan.com)
+# كل الدوال تعمل على مصفوفات NumPy، فيمكن حساب سنة كاملة لمدينة واحدة
+# أو يوم واحد لآلاف الإحداثيات باستدعاء واحد.
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+# إعدادات طرق الحساب بنفس أرقام aladhan.com
+# isha_minutes: العشاء بعد المغرب بعدد ثابت من الدقائق بدل الزاوية
+# ramadan_isha_minutes: نفس الشيء لكن في أيام رمضان فقط (أم القرى: 120 دقيقة كما في aladhan)
+METHODS = {
+    2: {"name": "ISNA", "fajr": 15.0, "isha": 15.0},
+    4: {"name": "Umm Al-Qura", "fajr": 18.5, "isha_minutes": 90, "ramadan_isha_minutes": 120},
+    5: {"name": "Egyptian General Authority of Survey", "fajr": 19.5, "isha": 17.5},
+    13: {"name": "Diyanet İşleri Başkanlığı, Turkey", "fajr": 18.0, "isha": 17.0},
+}
+DEFAULT_METHOD = 2
+
+SUNRISE_ANGLE = 0.833   # انكسار الضوء + نصف قطر قرص الشمس
+ASR_FACTOR = 1          # المذهب الشافعي (الافتراضي في aladhan)
+RAMADAN = 9
+
+# ترتيب الأعمدة في المصفوفة الناتجة
+PRAYER_COLUMNS = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
+
+
+def _sin(d):
+    return np.sin(np.radians(d))
+
+
+def _cos(d):
+    return np.cos(np.radians(d))
+
+
+def _tan(d):
+    return np.tan(np.radians(d))
+
+
+def _arcsin(x):
+    return np.degrees(np.arcsin(x))
+
+
+def _arccos(x):
+    return np.degrees(np.arccos(np.clip(x, -1.0, 1.0)))
+
+
+def _arccot(x):
+    return np.degrees(np.arctan(1.0 / x))
+
+
+def _fix(a, b):
+    return a - b * np.floor(a / b)
+
+
+def _julian(dates):
+    # dates: مصفوفة datetime64[D]
+    days = dates.astype("datetime64[D]").astype(np.int64)
+    return days + 2440587.5
+
+
+def _sun_position(jd):
+    d = jd - 2451545.0
+    g = _fix(357.529 + 0.98560028 * d, 360.0)
+    q = _fix(280.459 + 0.98564736 * d, 360.0)
+    L = _fix(q + 1.915 * _sin(g) + 0.020 * _sin(2 * g), 360.0)
+    e = 23.439 - 0.00000036 * d
+    ra = np.degrees(np.arctan2(_cos(e) * _sin(L), _cos(L))) / 15.0
+    eqt = q / 15.0 - _fix(ra, 24.0)
+    decl = _arcsin(_sin(e) * _sin(L))
+    return decl, eqt
+
+
+def _mid_day(jd, t):
+    _, eqt = _sun_position(jd + t)
+    return _fix(12.0 - eqt, 24.0)
+
+
+def _sun_angle_time(jd, lat, angle, t, ccw):
+    decl, _ = _sun_position(jd + t)
+    noon = _mid_day(jd, t)
+    cos_h = (-_sin(angle) - _sin(decl) * _sin(lat)) / (_cos(decl) * _cos(lat))
+    # الشمس لا تصل لهذه الزاوية (خطوط العرض العليا) -> NaN ثم يُعالج لاحقًا
+    cos_h = np.where(np.abs(cos_h) > 1.0, np.nan, cos_h)
+    t_angle = _arccos(cos_h) / 15.0
+    return noon - t_angle if ccw else noon + t_angle
+
+
+def _asr_time(jd, lat, t):
+    decl, _ = _sun_position(jd + t)
+    angle = -_arccot(ASR_FACTOR + _tan(np.abs(lat - decl)))
+    return _sun_angle_time(jd, lat, angle, t, False)
+
+
+def hijri_dates(dates):
+    # السنة والشهر واليوم الهجري لمصفوفة datetime64[D] بالتقويم الحسابي (الجدولي).
+    # تقويم أم القرى الرسمي قد يسبقه أو يتأخر عنه يومًا في أول الشهر أو آخره
+    # (مثلًا أول رمضان 1443 وآخر رمضان 1446)، ويتطابقان في باقي الأيام
+    jdn = np.asarray(dates, dtype="datetime64[D]").astype(np.int64) + 2440588
+    l = jdn - 1948440 + 10632
+    n = (l - 1) // 10631
+    l = l - 10631 * n + 354
+    j = ((10985 - l) // 5316) * ((50 * l) // 17719) + (l // 5670) * ((43 * l) // 15238)
+    l = l - ((30 - j) // 15) * ((17719 * j) // 50) - (j // 16) * ((15238 * j) // 43) + 29
+    month = (24 * l) // 709
+    day = l - (709 * month) // 24
+    year = 30 * n + j - 30
+    return year, month, day
+
+
+def _method_arrays(methods, dates, shape):
+    methods = np.broadcast_to(np.asarray(methods, dtype=np.int64), shape)
+    fajr = np.empty(shape)
+    isha = np.full(shape, np.nan)
+    isha_min = np.full(shape, np.nan)
+    ramadan = None
+    for mid in np.unique(methods):
+        params = METHODS.get(int(mid), METHODS[DEFAULT_METHOD])
+        mask = methods == mid
+        fajr[mask] = params["fajr"]
+        if "isha_minutes" in params:
+            isha_min[mask] = params["isha_minutes"]
+        else:
+            isha[mask] = params["isha"]
+        if "ramadan_isha_minutes" in params:
+            if ramadan is None:
+                ramadan = np.broadcast_to(hijri_dates(dates)[1] == RAMADAN, shape)
+            isha_min[mask & ramadan] = params["ramadan_isha_minutes"]
+    return fajr, isha, isha_min
+
+
+def compute_minutes(lat, lng, dates, methods, utc_offsets):
+    # كل المعاملات تقبل البث (broadcasting) حسب قواعد NumPy
+    # dates: datetime64[D]، utc_offsets: بالساعات
+    # النتيجة: دقائق منذ منتصف الليل المحلي، بالشكل (..., 5) بترتيب PRAYER_COLUMNS
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    utc_offsets = np.asarray(utc_offsets, dtype=np.float64)
+    shape = np.broadcast_shapes(lat.shape, lng.shape, dates.shape, utc_offsets.shape, np.shape(methods))
+    lat, lng, utc_offsets = (np.broadcast_to(a, shape) for a in (lat, lng, utc_offsets))
+    jd = np.broadcast_to(_julian(dates), shape) - lng / (15.0 * 24.0)
+    fajr_angle, isha_angle, isha_minutes = _method_arrays(methods, dates, shape)
+
+    # تكرار واحد بنفس القيم الابتدائية المستخدمة في PrayTimes
+    fajr = _sun_angle_time(jd, lat, fajr_angle, 5 / 24.0, True)
+    sunrise = _sun_angle_time(jd, lat, SUNRISE_ANGLE, 6 / 24.0, True)
+    dhuhr = _mid_day(jd, 12 / 24.0)
+    asr = _asr_time(jd, lat, 13 / 24.0)
+    sunset = _sun_angle_time(jd, lat, SUNRISE_ANGLE, 18 / 24.0, False)
+    isha = _sun_angle_time(jd, lat, np.nan_to_num(isha_angle), 18 / 24.0, False)
+
+    # تصحيح خطوط العرض العليا بطريقة الزاوية (الافتراضية في aladhan)
+    night = _fix(sunrise - sunset, 24.0)
+    fajr_portion = fajr_angle / 60.0 * night
+    fajr = np.where(np.isnan(fajr) | (_fix(sunrise - fajr, 24.0) > fajr_portion), sunrise - fajr_portion, fajr)
+    isha_portion = np.nan_to_num(isha_angle) / 60.0 * night
+    isha = np.where(np.isnan(isha) | (_fix(isha - sunset, 24.0) > isha_portion), sunset + isha_portion, isha)
+    isha = np.where(np.isnan(isha_minutes), isha, sunset + np.nan_to_num(isha_minutes) / 60.0)
+
+    hours = np.stack([fajr, dhuhr, asr, sunset, isha], axis=-1)
+    hours = hours + (utc_offsets - lng / 15.0)[..., None]
+    minutes = np.floor(_fix(hours, 24.0) * 60.0 + 0.5).astype(np.int64)
+    return minutes % (24 * 60)
+
+
+def utc_offsets_for(timezone, dates):
+    # فرق التوقيت عن UTC لكل يوم (بالساعات) مع مراعاة التوقيت الصيفي
+    tz = ZoneInfo(timezone)
+    out = np.empty(len(dates))
+    for i, d in enumerate(np.asarray(dates, dtype="datetime64[D]").astype(object)):
+        out[i] = datetime(d.year, d.month, d.day, 12, tzinfo=tz).utcoffset().total_seconds() / 3600.0
+    return out
+
+
+def minutes_to_str(m):
+    return f"{int(m) // 60:02d}:{int(m) % 60:02d}"
+
+
+def day_instants(day, timings, tz):
+    # لحظات صلوات يوم واحد {"Fajr": datetime, ...} من نصوص "HH:MM" بتوقيت tz.
+    # في خطوط العرض العليا قد يقع العشاء بعد منتصف الليل ("00:01")، فكل وقت أقدم من الصلاة
+    # التي قبله يُنقل إلى اليوم التالي
+    instants = {}
+    previous = None
+    for prayer in PRAYER_COLUMNS:
+        try:
+            hour, minute = map(int, timings[prayer].split(":"))
+        except Exception:
+            continue
+        when = datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz)
+        while previous is not None and when < previous:
+            when += timedelta(days=1)
+        instants[prayer] = when
+        previous = when
+    return instants
+
+
+def compute_year(lat, lng, method, timezone, year):
+    # جدول سنة كاملة لمدينة واحدة: مصفوفة (عدد الأيام, 5)
+    dates = np.arange(f"{year}-01-01", f"{year + 1}-01-01", dtype="datetime64[D]")
+    return dates, compute_minutes(lat, lng, dates, method, utc_offsets_for(timezone, dates))
+
+
+def compute_range(lat, lng, method, timezone, start, days):
+    dates = np.datetime64(start, "D") + np.arange(days)
+    return dates, compute_minutes(lat, lng, dates, method, utc_offsets_for(timezone, dates))
+
+
+def compute_timings(lat, lng, method, timezone, day=None):
+    # نفس شكل نتيجة API aladhan بعد التنظيف: {"Fajr": "HH:MM", ...}
+    if day is None:
+        day = datetime.now(ZoneInfo(timezone)).date()
+    row = compute_minutes(lat, lng, np.datetime64(day, "D"), method, utc_offsets_for(timezone, [day])[0])
+    return {name: minutes_to_str(m) for name, m in zip(PRAYER_COLUMNS, row)}
+
+
+def month_table(lat, lng, method, timezone, year, month):
+    # جدول شهر كامل بصيغة {"YYYY-MM-DD": {"Fajr": "HH:MM", ...}}
+    start = np.datetime64(f"{year}-{month:02d}-01", "D")
+    end = np.datetime64(f"{year}-{month:02d}", "M") + 1
+    days = int((end.astype("datetime64[D]") - start).astype(np.int64))
+    dates, minutes = compute_range(lat, lng, method, timezone, start, days)
+    return {
+        str(d): {name: minutes_to_str(m) for name, m in zip(PRAYER_COLUMNS, row)}
+        for d, row in zip(dates, minutes)
+    }
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# بيانات المدن وطرق الحساب وأسماء الصلوات المشتركة بين الواجهة والخدمة
+
+CITIES = {
+    "الرياض": (24.7136, 46.6753),
+    "دمياط": (31.4165, 31.8133),
+    "القاهرة": (30.0444, 31.2357),
+    "دبي": (25.276987, 55.296249),
+    "الدوحة": (25.2854, 51.5310),
+    "الكويت": (29.3759, 47.9774),
+    "مسقط": (23.5859, 58.4059),
+    "بغداد": (33.3152, 44.3661),
+    "بيروت": (33.8938, 35.5018),
+    "الخرطوم": (15.5007, 32.5599),
+    "مكة": (21.3891, 39.8579),
+    "المدينة المنورة": (24.5247, 39.5692),
+    "جدة": (21.2854, 39.2376),
+    "الجزائر": (36.7538, 3.0422),
+    "تونس": (36.8065, 10.1815),
+    "الدار البيضاء": (33.5731, -7.5898),
+    "الخبر": (26.2172, 50.1971),
+    "الأحساء": (25.3603, 49.5846),
+    "إسطنبول": (41.0082, 28.9784),
+    "دوزجا": (40.8438, 31.1565),    
+}
+
+TIMEZONE_MAPPING = {
+    "الرياض": "Asia/Riyadh",
+    "دمياط": "Africa/Cairo",
+    "القاهرة": "Africa/Cairo",
+    "دبي": "Asia/Dubai",
+    "الدوحة": "Asia/Qatar",
+    "الكويت": "Asia/Kuwait",
+    "مسقط": "Asia/Muscat",
+    "بغداد": "Asia/Baghdad",
+    "بيروت": "Asia/Beirut",
+    "الخرطوم": "Africa/Khartoum",
+    "مكة": "Asia/Riyadh",
+    "المدينة المنورة": "Asia/Riyadh",
+    "جدة": "Asia/Riyadh",
+    "الجزائر": "Africa/Algiers",
+    "تونس": "Africa/Tunis",
+    "الدار البيضاء": "Africa/Casablanca",
+    "الخبر": "Asia/Riyadh",
+    "الأحساء": "Asia/Riyadh",
+    "إسطنبول": "Europe/Istanbul",
+    "دوزجا": "Europe/Istanbul",
+}
+
+METHOD_MAPPING = {
+    "الرياض": 4,
+    "دمياط": 5,
+    "القاهرة": 5,
+    "دبي": 4,
+    "الدوحة": 4,
+    "الكويت": 4,
+    "مسقط": 4,
+    "بغداد": 5,
+    "بيروت": 5,
+    "الخرطوم": 5,
+    "مكة": 4,
+    "المدينة المنورة": 4,
+    "جدة": 4,
+    "الجزائر": 2,
+    "تونس": 2,
+    "الدار البيضاء": 2,
+    "الخبر": 4,
+    "الأحساء": 4,
+    "إسطنبول": 13,
+    "دوزجا": 13,
+}
+
+# ترتيب الصلاة حسب طلبك مع اسم عرض عربي
+VALID_PRAYERS = ["Fajr", "Dhuhr", "Asr", "Maghrib", "Isha"]
+PRAYER_NAMES_AR = {
+    "Fajr": "الفجر",
+    "Dhuhr": "الظهر",
+    "Asr": "العصر",
+    "Maghrib": "المغرب",
+    "Isha": "العشاء"
+}
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+# جدولة المواعيد على أساس الأحداث: كومة (heap) بالمواعيد القادمة وخيط واحد ينام حتى أقرب موعد
+# بدل الفحص كل بضع ثوانٍ.
+# المواعيد تُعطى كلحظات حقيقية (time.time())، والانتظار نفسه على الساعة الرتيبة (monotonic)
+# فلا يتأثر بتغيير ساعة النظام. عند قفز ساعة النظام (NTP، تعديل يدوي، الاستيقاظ من السكون)
+# تُعاد حسابات المواعيد ويُبلَّغ on_clock_jump. على لينكس يصل الإشعار من النواة (timerfd) فورًا.
+import os
+import sys
+import heapq
+import itertools
+import threading
+import time
+
+MISSED_GRACE = 60           # بعد هذا التأخير (ثوانٍ) يعتبر الموعد فائتًا (سكون الجهاز مثلًا)
+CLOCK_CHECK_INTERVAL = 60   # أقصى مدة نوم متواصلة حتى نلاحظ تغيير ساعة النظام (بدون إشعار من النظام)
+CLOCK_WATCH_INTERVAL = 900  # نفس الشيء عند وجود إشعار من النظام (احتياط للاستيقاظ من السكون فقط)
+CLOCK_JUMP_THRESHOLD = 1.0  # فرق (ثوانٍ) بين الساعتين يعتبر قفزة في ساعة النظام
+
+
+def clock_offset():
+    return time.time() - time.monotonic()
+
+
+class ClockWatcher:
+    # ينتظر إشعار النواة بتغيير CLOCK_REALTIME عبر timerfd مع TFD_TIMER_CANCEL_ON_SET (لينكس فقط)
+    def __init__(self, callback):
+        self.callback = callback
+        self._fd = None
+
+    def start(self):
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            import ctypes
+
+            class timespec(ctypes.Structure):
+                _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+            class itimerspec(ctypes.Structure):
+                _fields_ = [("it_interval", timespec), ("it_value", timespec)]
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            self._libc = libc
+            self._itimerspec = itimerspec
+            self._byref = ctypes.byref
+            fd = libc.timerfd_create(0, os.O_CLOEXEC)   # CLOCK_REALTIME
+            if fd < 0:
+                return False
+            self._fd = fd
+            if not self._arm():
+                os.close(fd)
+                self._fd = None
+                return False
+        except Exception:
+            return False
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def _arm(self):
+        # مؤقت بعيد جدًا، والمهم أن read() يرجع ECANCELED عند تغيير الساعة
+        spec = self._itimerspec()
+        spec.it_value.tv_sec = int(time.time()) + 10 * 365 * 24 * 3600
+        flags = 1 | 2   # TFD_TIMER_ABSTIME | TFD_TIMER_CANCEL_ON_SET
+        return self._libc.timerfd_settime(self._fd, flags, self._byref(spec), None) == 0
+
+    def _run(self):
+        while self._fd is not None:
+            try:
+                os.read(self._fd, 8)
+            except OSError:
+                # ECANCELED: تغيرت ساعة النظام
+                pass
+            if self._fd is None or not self._arm():
+                return
+            try:
+                self.callback()
+            except Exception:
+                pass
+
+    def stop(self):
+        fd, self._fd = self._fd, None
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class PrayerScheduler:
+    def __init__(self, on_missed=None, grace=MISSED_GRACE, on_clock_jump=None, log=None):
+        # on_missed(key, when, late) يُستدعى للمواعيد التي فاتت بأكثر من grace ثانية
+        # on_clock_jump(jump) يُستدعى بعد قفز ساعة النظام بـ jump ثانية (موجبة للأمام)
+        # log(message, **fields) لتسجيل أخطاء الدوال المجدولة (نفس EventLog.emit)
+        self.on_missed = on_missed
+        self.on_clock_jump = on_clock_jump
+        self.log = log or (lambda message, **fields: print(message))
+        self.grace = grace
+        self._heap = []     # (موعد monotonic، ترتيب، المفتاح، الدالة، المعاملات، اللحظة الحقيقية)
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._offset = clock_offset()
+        self._watcher = None
+        self._check_interval = CLOCK_CHECK_INTERVAL
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._watcher = ClockWatcher(self.wake)
+        if self._watcher.start():
+            self._check_interval = CLOCK_WATCH_INTERVAL
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._watcher is not None:
+            self._watcher.stop()
+
+    def schedule(self, when, key, callback, *args):
+        # when: طابع زمني (time.time())
+        with self._cond:
+            heapq.heappush(self._heap, (when - self._offset, next(self._counter), key, callback, args, when))
+            self._cond.notify_all()
+
+    def cancel(self, key):
+        with self._cond:
+            self._heap = [e for e in self._heap if e[2] != key]
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def clear(self):
+        with self._cond:
+            self._heap = []
+            self._cond.notify_all()
+
+    def wake(self):
+        # إعادة حساب مدة النوم فورًا (بعد تغيير الساعة مثلًا)
+        with self._cond:
+            self._cond.notify_all()
+
+    def next_deadline(self):
+        with self._cond:
+            if not self._heap:
+                return None
+            entry = self._heap[0]
+            return entry[5], entry[2]
+
+    def pending(self):
+        with self._cond:
+            return sorted((e[5], e[2]) for e in self._heap)
+
+    def _check_clock(self):
+        # يُستدعى والقفل محجوز: إذا قفزت ساعة النظام نعيد بناء المواعيد من لحظاتها الحقيقية،
+        # والمواعيد التي صارت في الماضي (السكون مثلًا) تُسحب من الكومة وتُرجع لتُنفذ أو تُسجل كفائتة
+        offset = clock_offset()
+        jump = offset - self._offset
+        if abs(jump) < CLOCK_JUMP_THRESHOLD:
+            return 0.0, []
+        self._offset = offset
+        now = time.time()
+        due = sorted((e for e in self._heap if e[5] <= now), key=lambda e: (e[5], e[1]))
+        self._heap = [(e[5] - offset,) + e[1:] for e in self._heap if e[5] > now]
+        heapq.heapify(self._heap)
+        return jump, due
+
+    def _dispatch(self, key, callback, args, when):
+        late = time.time() - when
+        try:
+            if late > self.grace:
+                if self.on_missed:
+                    self.on_missed(key, when, late)
+            else:
+                callback(*args)
+        except Exception as e:
+            self.log(f"خطأ في تنفيذ الموعد {key}: {e}", level="warning", event="callback_failed", key=str(key))
+
+    def _run(self):
+        while True:
+            jump = 0.0
+            due = []
+            with self._cond:
+                while self._running:
+                    jump, due = self._check_clock()
+                    if jump:
+                        break
+                    if not self._heap:
+                        self._cond.wait(self._check_interval)
+                        continue
+                    delay = self._heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(min(delay, self._check_interval))
+                if not self._running:
+                    return
+                if not jump:
+                    _, _, key, callback, args, when = heapq.heappop(self._heap)
+
+            if jump:
+                # المواعيد الفائتة أولًا، لأن on_clock_jump يعيد بناء الجدول ويمسح الكومة
+                for _, _, key, callback, args, when in due:
+                    self._dispatch(key, callback, args, when)
+                if self.on_clock_jump:
+                    try:
+                        self.on_clock_jump(jump)
+                    except Exception as e:
+                        self.log(f"خطأ بعد تغيير ساعة النظام: {e}", level="warning", event="callback_failed",
+                                 key="clock_jump")
+                continue
+
+            self._dispatch(key, callback, args, when)
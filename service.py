@@ -0,0 +1,787 @@
+# -*- coding: utf-8 -*-
+# نواة البرنامج بدون أي واجهة رسومية: الإعدادات، تحديث المواقيت، الجدولة وتشغيل الأذان.
+# تستخدمها الواجهة (adhan.py) ووضع الخدمة بدون واجهة (daemon.py).
+import time
+import socket
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from prayer_data import CITIES, VALID_PRAYERS, PRAYER_NAMES_AR
+from player import AdhanPlayer, ADHAN_FILES, AUDIO_BACKENDS, PREROLL_MAX_AGE, get_output_devices
+from timetable import TimetableStore, TIMETABLE_DIR
+from scheduler import PrayerScheduler
+from sites import load_sites, compute_deadlines
+from config_store import ConfigStore
+from fetcher import TimingsFetcher, CALENDAR_API_URL
+from eventlog import EventLog
+from metrics import Metrics
+from places import Place, find_place, get_index
+from updater import Updater, UPDATE_MANIFEST_URL, UPDATE_RATE_LIMIT
+
+CONFIG_FILE = "config.json"
+OFFLINE_UPDATE_INTERVAL = 3600  # 1 ساعة للتحديث عند وجود إنترنت
+FAILED_UPDATE_INTERVAL = 1800   # إعادة المحاولة بعد نصف ساعة عند الفشل
+ADHAN_DURATION = 15             # مدة الأذان بالثواني (السياسة الافتراضية)
+PLAYBACK_MODES = ("full", "duration")
+PLAYBACK_DONE_MARGIN = 1.0      # ثوانٍ بعد نهاية التشغيل المتوقعة قبل تسجيل قياس أول صوت
+FADE_OUT_SECONDS = 2.0          # مدة خفوت الصوت في نهاية الأذان
+STREAM_BLOCK_SIZE = 512         # حجم كتلة الصوت في مسار sounddevice (زمن الاستجابة)
+PREFETCH_MONTHS = 12            # عدد الأشهر التي تُجهّز مسبقًا في مخزن المواقيت
+ROLLOVER_RETRY = 300            # إعادة محاولة تحديث مواقيت اليوم الجديد بعد 5 دقائق
+PREROLL_LEAD = 10               # ثوانٍ قبل كل موعد لفحص جهاز الصوت وإيقاظه وتجهيز أول الأذان
+INSTANCE_PORT = 65432
+
+
+def check_already_running():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind(('127.0.0.1', INSTANCE_PORT))
+        return sock
+    except socket.error:
+        return None
+
+
+class PrayerService:
+    def __init__(self, events=None, on_timings_changed=None):
+        # events: سجل الأحداث (الواجهة تعرض آخره في نافذة السجل، ووضع الخدمة يطبعه على الشاشة)
+        self.events = events or EventLog(echo=True)
+        self.log = self.events.emit
+        self.on_timings_changed = on_timings_changed
+
+        self.city_names = list(CITIES.keys())
+        self.adhan_files = list(ADHAN_FILES)
+        self.audio_devices = []
+
+        self.config_store = ConfigStore(CONFIG_FILE, on_saved=self.on_config_saved, on_error=self.on_config_error)
+        self.cfg = self.load_config()
+        self.player = AdhanPlayer(adhan_file=self.cfg['adhan'], volume=self.cfg['volume'],
+                                  output_device=self.cfg.get('output_device'), log=self.log)
+        self.apply_audio_settings()
+        self.timings = self.cfg.get("timings", {})
+        self.sites = []
+        self.policy_players = {}    # ملف الأذان -> AdhanPlayer لصلوات لها صوت مختلف (مثل أذان الفجر)
+        self._playbacks = {}        # ("playback_done", id) -> (PlaybackHandle، سجل القياس)
+        self._prerolls = {}         # ("preroll_expire", id(player)) -> (AdhanPlayer، PlaybackHandle، وقت الانتهاء)
+        self.fetcher = TimingsFetcher(url=self.cfg.get("api_url", CALENDAR_API_URL), cache_dir=TIMETABLE_DIR)
+        self.store = TimetableStore(self.fetch_month, batch_provider=self.fetch_months)
+        self.metrics = Metrics()
+        self.metrics.sources.append(self.fetch_stats)
+        self.scheduler = PrayerScheduler(on_missed=self.on_prayer_missed, on_clock_jump=self.on_clock_jump, log=self.log)
+        self.updater_thread = None
+        # تحديث المواقيت المطلوب من خيط المؤقتات (قفز الساعة، بداية اليوم) يُنفذ هنا، لأنه قد ينتظر
+        # الشبكة طوال إعادة المحاولة فيؤخر مواعيد الأذان لو نُفذ على خيط المؤقتات نفسه
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-worker")
+        self.app_updater = None     # تحديث البرنامج نفسه (updater.py)، وليس تحديث المواقيت
+        self._timings_lock = threading.RLock()
+        self.is_running = False
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self.is_running = True
+        self._stop_event.clear()
+        # خطأ في الصوت لا يمنع الجدولة: يُسجَّل ويستمر البرنامج (ويحاول التشغيل عند الموعد)
+        try:
+            self.init_audio()
+        except Exception as e:
+            self.log(f"خطأ في تهيئة الصوت: {e}", level="error", event="audio_init_failed")
+        self.load_sites()
+        self.start_updater()
+        self.start_scheduler()
+        self.start_app_updater()
+
+    def init_audio(self, refresh=False):
+        # فحص أجهزة الصوت بعد عرض المواقيت المحفوظة، وفك ملف الأذان في الخلفية
+        self.audio_devices = get_output_devices(refresh=refresh, log=self.log)
+        if self.cfg.get("output_device") not in self.audio_devices:
+            self.cfg["output_device"] = self.audio_devices[0] if self.audio_devices else ""
+            self.player.output_device = self.cfg["output_device"]
+        self.player.extra_devices = [d for d in self.cfg.get("extra_output_devices", []) if d in self.audio_devices]
+        threading.Thread(target=self.player.preload, daemon=True).start()
+
+    def stop(self):
+        self.is_running = False
+        self._stop_event.set()
+        self.scheduler.stop()
+        self.worker.shutdown(wait=False, cancel_futures=True)
+        if self.app_updater is not None:
+            self.app_updater.stop()
+        self.player.stop()
+        for player in self.policy_players.values():
+            player.stop()
+        self.fetcher.close()
+        self.store.close()
+        self.config_store.close()
+        self.events.close()
+        for site in self.sites:
+            if site.player is not None:
+                site.player.stop()
+
+    def load_sites(self):
+        for site in self.sites:
+            if site.player is not None:
+                site.player.stop()
+        self.sites = load_sites(self.cfg.get("sites", []), self.cfg['adhan'], self.cfg['volume'], self.log)
+        if self.sites:
+            self.log(f"عدد المواقع الإضافية: {len(self.sites)}")
+
+    def site_player(self, site):
+        # مشغل كل موقع يُنشأ عند أول أذان له فقط
+        if site.player is None:
+            site.player = AdhanPlayer(adhan_file=site.adhan, volume=site.volume, output_device=site.output_device,
+                                      backend=self.cfg.get("audio_backend", "auto"),
+                                      block_size=self.cfg.get("block_size", STREAM_BLOCK_SIZE),
+                                      fade_in=self.cfg.get("fade_in", 0.0),
+                                      fade_out=self.cfg.get("fade_out", FADE_OUT_SECONDS), log=self.log)
+        return site.player
+
+    def load_config(self):
+        try:
+            cfg = self.config_store.load()
+        except Exception as e:
+            cfg = None
+            print(f"خطأ في تحميل الإعدادات: {e}")
+        if cfg is not None:
+            try:
+                if "city" not in cfg or (cfg["city"] not in self.city_names
+                                         and (cfg.get("location") or {}).get("name") != cfg["city"]):
+                    cfg["city"] = self.city_names[0]
+                if "adhan" not in cfg or cfg["adhan"] not in self.adhan_files:
+                    cfg["adhan"] = self.adhan_files[0]
+                if "volume" not in cfg:
+                    cfg["volume"] = 0.8
+                if "timings" not in cfg:
+                    cfg["timings"] = {}
+                if "output_device" not in cfg:
+                    cfg["output_device"] = ""
+                if "time_format_24h" not in cfg:
+                    cfg["time_format_24h"] = True
+                if cfg.get("timings_source") not in ("local", "api"):
+                    cfg["timings_source"] = "local"
+                if cfg.get("audio_backend") not in AUDIO_BACKENDS:
+                    cfg["audio_backend"] = "auto"
+                if "extra_output_devices" not in cfg:
+                    cfg["extra_output_devices"] = []
+                if "block_size" not in cfg:
+                    cfg["block_size"] = STREAM_BLOCK_SIZE
+                if "fade_in" not in cfg:
+                    cfg["fade_in"] = 0.0
+                if "fade_out" not in cfg:
+                    cfg["fade_out"] = FADE_OUT_SECONDS
+                if not isinstance(cfg.get("sites"), list):
+                    cfg["sites"] = []
+                if "auto_update" not in cfg:
+                    # التحديث التلقائي اختياري: يفعّله المستخدم بنفسه
+                    cfg["auto_update"] = False
+                cfg["playback"] = self.normalize_playback(cfg.get("playback"))
+                return cfg
+            except Exception as e:
+
+                print(f"خطأ في تحميل الإعدادات: {e}")
+        return {
+            "city": self.city_names[0],
+            "adhan": self.adhan_files[0],
+            "volume": 0.8,
+            "timings": {},
+            "output_device": "",
+            "time_format_24h": True,
+            "timings_source": "local",
+            "audio_backend": "auto",
+            "extra_output_devices": [],
+            "block_size": STREAM_BLOCK_SIZE,
+            "fade_in": 0.0,
+            "fade_out": FADE_OUT_SECONDS,
+            "sites": [],
+            "auto_update": False,
+            "playback": {"default": {"mode": "duration", "duration": ADHAN_DURATION}}
+        }
+
+    def save_config(self):
+        # الكتابة الفعلية تتم في الخلفية بعد هدوء التغييرات وفقط إذا تغير شيء
+        self.cfg['volume'] = self.player.volume
+        self.cfg['timings'] = self.timings
+        self.config_store.save(self.cfg)
+
+    def on_config_saved(self):
+        self.log("تم حفظ الإعدادات والمواقيت بنجاح.", level="debug", event="config_saved")
+
+    def on_config_error(self, e):
+        self.log(f"خطأ في حفظ الإعدادات: {e}", level="error", event="config_error")
+
+    def reload(self):
+        # إعادة قراءة ملف الإعدادات وتطبيقه (مفيد عند تعديله يدويًا في وضع الخدمة)
+        self.cfg = self.load_config()
+        self.player.stop()
+        self.player.set_volume(self.cfg['volume'])
+        self.apply_audio_settings()
+        self.player.change_sound(self.cfg['adhan'])
+        self.player.output_device = self.cfg.get('output_device')
+        for player in self.policy_players.values():
+            player.stop()
+        self.policy_players = {}
+        self.init_audio(refresh=True)
+        self.load_sites()
+        self.log("تم إعادة تحميل الإعدادات.")
+        return self.update_timings()
+
+    def apply_audio_settings(self):
+        self.player.set_backend(self.cfg.get("audio_backend", "auto"))
+        self.player.block_size = self.cfg.get("block_size", STREAM_BLOCK_SIZE)
+        self.player.fade_in = self.cfg.get("fade_in", 0.0)
+        self.player.fade_out = self.cfg.get("fade_out", FADE_OUT_SECONDS)
+
+    def city_place(self, city=None):
+        # المدن المدمجة من prayer_data، أو المكان المحفوظ في "location"، أو البحث في فهرس الأماكن
+        city = city or self.cfg.get("city")
+        location = self.cfg.get("location")
+        if location and location.get("name") == city:
+            try:
+                return Place.from_config(location)
+            except Exception:
+                pass
+        try:
+            return find_place(city) if city else None
+        except Exception as e:
+            self.log(f"خطأ في فهرس الأماكن: {e}", level="error")
+            return None
+
+    def city_zone(self, place=None):
+        # المنطقة الزمنية للمدينة المختارة وليس منطقة الجهاز (جهاز على UTC يؤذن لإسطنبول مثلًا)
+        place = place or self.city_place()
+        try:
+            return ZoneInfo(place.timezone)
+        except Exception:
+            return None     # None = توقيت الجهاز
+
+    def city_today(self, place=None):
+        return datetime.now(self.city_zone(place)).date()
+
+    def search_places(self, query, limit=20):
+        if not query.strip():
+            return list(self.city_names)
+        try:
+            return [place.label for place in get_index().search(query, limit)]
+        except Exception as e:
+            self.log(f"خطأ في البحث عن المدينة: {e}", level="error")
+            return []
+
+    def set_city(self, city):
+        place = self.city_place(city)
+        if place is None:
+            self.log("المدينة غير موجودة", level="warning")
+            return False
+        self.cfg['city'] = place.label
+        if place.label in self.city_names:
+            self.cfg.pop("location", None)
+        else:
+            self.cfg["location"] = place.to_config()
+        self.save_config()
+        return self.update_timings()
+
+    def set_adhan(self, adhan_file):
+        if adhan_file not in self.adhan_files:
+            return False
+        self.player.change_sound(adhan_file)
+        self.cfg['adhan'] = adhan_file
+        self.save_config()
+        self.log(f"تم تغيير صوت الأذان إلى: {adhan_file}")
+        return True
+
+    def set_output_device(self, device):
+        if device not in self.audio_devices:
+            self.log("جهاز الإخراج المختار غير متوفر.", level="warning")
+            return False
+        if self.player.is_playing:
+            self.player.stop()
+        self.player.output_device = device
+        self.cfg['output_device'] = device
+        self.save_config()
+        self.log(f"تم تغيير جهاز إخراج الصوت إلى: {device}")
+        return True
+
+    def set_volume(self, volume):
+        self.player.set_volume(volume)
+        for player in self.policy_players.values():
+            player.set_volume(volume)
+        self.save_config()
+
+    def set_time_format(self, use_24h):
+        self.cfg["time_format_24h"] = use_24h
+        self.save_config()
+
+    def play(self):
+        # التشغيل اليدوي: الملف كاملًا مرة واحدة، ولا يقطعه انتهاء مدة أذان سابق
+        self.player.play()
+        self.log("تم تشغيل الأذان")
+
+    def stop_playback(self):
+        self.player.stop()
+        for player in self.policy_players.values():
+            player.stop()
+        for site in self.sites:
+            if site.player is not None:
+                site.player.stop()
+        self.log("تم إيقاف الأذان")
+
+    def is_playing(self):
+        return (self.player.is_playing or any(p.is_playing for p in self.policy_players.values())
+                or any(site.player is not None and site.player.is_playing for site in self.sites))
+
+    def playback_policy(self, prayer):
+        # "playback" في الإعدادات: سياسة افتراضية وسياسة لكل صلاة، مثل:
+        #   {"default": {"mode": "duration", "duration": 15},
+        #    "Fajr": {"mode": "full", "adhan": "adhan2.mp3", "fade_out": 3}}
+        # mode: "full" الملف كاملًا مرة واحدة، "duration" عدد ثوانٍ محدد
+        policies = self.cfg.get("playback", {})
+        policy = {"mode": "duration", "duration": ADHAN_DURATION, "adhan": None, "fade_out": None}
+        policy.update(policies.get("default", {}))
+        policy.update(policies.get(prayer, {}))
+        if policy["mode"] not in PLAYBACK_MODES:
+            policy["mode"] = "duration"
+        return policy
+
+    def normalize_playback(self, playback):
+        # كل حقل غير صالح (مثل "duration": "15s") يُستبدل بالافتراضي وحده بدل إسقاط السياسة كلها:
+        # في "default" بالقيمة المدمجة، وفي سياسة الصلاة يُحذف فتُستخدم قيمة "default"
+        if not isinstance(playback, dict):
+            return {"default": {"mode": "duration", "duration": ADHAN_DURATION}}
+        builtin = {"mode": "duration", "duration": ADHAN_DURATION, "adhan": None, "fade_out": None}
+        result = {}
+        for name, policy in playback.items():
+            if name != "default" and name not in VALID_PRAYERS:
+                self.log(f"سياسة تشغيل لصلاة غير معروفة: {name}", level="warning", event="config_invalid", field="playback")
+                continue
+            if not isinstance(policy, dict):
+                self.log(f"سياسة تشغيل غير صالحة لـ {name}", level="warning", event="config_invalid", field="playback")
+                policy = {}
+            clean = {}
+            for field, value in policy.items():
+                valid = self.valid_policy_value(field, value)
+                if valid is None and value is not None:
+                    self.log(f"قيمة غير صالحة في سياسة {name}: {field}={value!r}، تُستخدم القيمة الافتراضية",
+                             level="warning", event="config_invalid", field=f"playback.{name}.{field}")
+                    if name == "default" and field in builtin:
+                        clean[field] = builtin[field]
+                    continue
+                clean[field] = valid
+            result[name] = clean
+        result.setdefault("default", {"mode": "duration", "duration": ADHAN_DURATION})
+        return result
+
+    def valid_policy_value(self, field, value):
+        # القيمة بعد التحويل، أو None إذا كانت غير صالحة
+        try:
+            if field == "mode":
+                return value if value in PLAYBACK_MODES else None
+            if field == "duration":
+                value = float(value)
+                return value if 0 < value < float("inf") else None
+            if field == "fade_out":
+                value = float(value)
+                return value if 0 <= value < float("inf") else None
+            if field == "adhan":
+                return value if value in self.adhan_files else None
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    def prayer_player(self, policy):
+        adhan = policy.get("adhan")
+        if not adhan or adhan == self.cfg['adhan'] or adhan not in self.adhan_files:
+            return self.player
+        player = self.policy_players.get(adhan)
+        if player is None:
+            player = AdhanPlayer(adhan_file=adhan, log=self.log)
+            self.policy_players[adhan] = player
+        # نفس إعدادات المشغل الرئيسي (الجهاز والصوت) مع ملف أذان مختلف
+        player.set_backend(self.player.backend)
+        player.volume = self.player.volume
+        player.output_device = self.player.output_device
+        player.extra_devices = list(self.player.extra_devices)
+        player.block_size = self.player.block_size
+        player.fade_in = self.player.fade_in
+        player.fade_out = self.player.fade_out
+        return player
+
+    def playback_args(self, policy):
+        fade_out = policy.get("fade_out")
+        fade_out = None if fade_out is None else float(fade_out)
+        if policy["mode"] == "full":
+            return {"fade_out": fade_out}
+        return {"duration": float(policy["duration"]), "loop": True, "fade_out": fade_out}
+
+    def start_playback(self, player, policy):
+        return player.play(**self.playback_args(policy))
+
+    def on_preroll(self, prayer, site=None):
+        # قبل الموعد بـ PREROLL_LEAD ثانية: الجهاز المحفوظ في الإعدادات (أو الموقع) يُفحص من جديد،
+        # فإذا فُصل يُستخدم الافتراضي، وإذا أُعيد توصيله برقم آخر يُعثر عليه بالاسم
+        policy = self.playback_policy(prayer)
+        try:
+            if site is None:
+                self.player.output_device = self.cfg.get("output_device")
+                self.player.extra_devices = list(self.cfg.get("extra_output_devices", []))
+                changes = self.player.check_device()
+                player = self.prayer_player(policy)
+                player.prepare(check=False, **self.playback_args(policy))
+            else:
+                player = self.site_player(site)
+                player.output_device = site.output_device
+                changes = player.prepare(**self.playback_args(policy))
+        except Exception as e:
+            self.log(f"تعذر تجهيز جهاز الصوت قبل الموعد: {e}", level="warning", event="preroll_failed", prayer=prayer)
+            return
+        for old, new in changes:
+            self.log(f"جهاز الصوت «{old}» غير موجود، سيتم استخدام «{new or 'الجهاز الافتراضي'}»",
+                     level="warning", event="audio_device_changed", old=old, new=new)
+        self.metrics.inc("adhan_prerolls_total", site=site.name if site else "")
+        self.watch_preroll(player)
+
+    def watch_preroll(self, player):
+        # التجهيز الذي لم يُستخدم (موعد فات أو تغيرت الإعدادات) يُغلق بموعد في طابور المؤقتات
+        handle = player.prepared
+        if handle is None:
+            return
+        key = ("preroll_expire", id(player))
+        self.scheduler.cancel(key)
+        expires = time.time() + PREROLL_MAX_AGE
+        self._prerolls[key] = (player, handle, expires)
+        self.scheduler.schedule(expires, key, self.on_preroll_expired, key)
+
+    def on_preroll_expired(self, key):
+        entry = self._prerolls.pop(key, None)
+        if entry is not None:
+            entry[0].discard_prepared(entry[1])
+
+    def preroll_used(self, player):
+        key = ("preroll_expire", id(player))
+        if self._prerolls.pop(key, None) is not None:
+            self.scheduler.cancel(key)
+
+    def schedule_preroll(self, target, prayer, site=None):
+        when = target - PREROLL_LEAD
+        if when > time.time():
+            key = ("preroll", site.name, prayer) if site else ("preroll", prayer)
+            self.scheduler.schedule(when, key, self.on_preroll, prayer, site)
+
+    def describe_policy(self, policy):
+        if policy["mode"] == "full":
+            return "تشغيل الأذان كاملًا"
+        return f"تشغيل الأذان لمدة {float(policy['duration']):g} ثانية"
+
+    def watch_playback(self, handle, record):
+        # بدل خيط ينام طوال مدة الأذان: موعد واحد في طابور المؤقتات عند نهاية التشغيل المتوقعة
+        key = ("playback_done", id(handle))
+        self._playbacks[key] = (handle, record)
+        self.scheduler.schedule(handle.ends_at + PLAYBACK_DONE_MARGIN, key, self.on_playback_done, key)
+
+    def on_playback_done(self, key):
+        entry = self._playbacks.pop(key, None)
+        if entry is None:
+            return
+        handle, record = entry
+        self.metrics.prayer_audio(record, handle.first_audio_time)
+        self.export_metrics()
+        if handle.latency is not None:
+            self.log(f"بدأ صوت الأذان بعد {handle.latency * 1000:.0f} مللي ثانية من موعده",
+                     level="debug", event="audio_latency", latency_ms=round(handle.latency * 1000, 1))
+
+    def next_prayer(self, site=None):
+        for when, key in self.scheduler.pending():
+            if site is None and key in VALID_PRAYERS:
+                return key, when
+            if site is not None and isinstance(key, tuple) and key[0] == site.name:
+                return key[1], when
+        return None
+
+    def site_status(self, site):
+        upcoming = self.next_prayer(site)
+        return {
+            "name": site.name,
+            "timezone": site.timezone,
+            "method": site.method,
+            "timings": dict(site.timings),
+            "adhan": site.adhan,
+            "output_device": site.output_device,
+            "is_playing": site.player is not None and site.player.is_playing,
+            "next_prayer": {
+                "prayer": upcoming[0],
+                "time": datetime.fromtimestamp(upcoming[1], ZoneInfo(site.timezone)).isoformat(timespec="seconds"),
+            } if upcoming else None,
+        }
+
+    def status(self):
+        upcoming = self.next_prayer()
+        place = self.city_place()
+        return {
+            "city": self.cfg.get("city"),
+            "method": place.method if place else None,
+            "timezone": place.timezone if place else None,
+            "timings": dict(self.timings),
+            "adhan": self.cfg.get("adhan"),
+            "volume": self.player.volume,
+            "output_device": self.player.output_device,
+            "extra_output_devices": list(self.player.extra_devices),
+            "audio_backend": "sounddevice" if self.player.uses_stream() else "pygame",
+            "last_latency_ms": None if self.player.last_latency is None else round(self.player.last_latency * 1000, 1),
+            "is_playing": self.is_playing(),
+            "next_prayer": {
+                "prayer": upcoming[0],
+                "time": datetime.fromtimestamp(upcoming[1], self.city_zone(place)).isoformat(timespec="seconds"),
+            } if upcoming else None,
+            "sites": [self.site_status(site) for site in self.sites],
+            "update": self.app_updater.status() if self.app_updater else None,
+        }
+
+    def update_timings(self):
+        # قد تُستدعى من خيط التحديث وخيوط الواجهة في نفس الوقت
+        with self._timings_lock:
+            started = time.monotonic()
+            success = self._update_timings()
+        self.metrics.observe("adhan_timings_update_seconds", time.monotonic() - started)
+        self.metrics.inc("adhan_timings_updates_total", result="ok" if success else "failed")
+        self.export_metrics()
+        return success
+
+    def fetch_stats(self):
+        return [("adhan_fetch_events_total", {"event": k}, v) for k, v in self.fetcher.stats.items()]
+
+    def export_metrics(self):
+        # "metrics_file" في الإعدادات: ملف .prom (Prometheus) أو .json يُحدَّث بعد كل أذان وكل تحديث
+        path = self.cfg.get("metrics_file")
+        if not path:
+            return
+        try:
+            self.metrics.write(path)
+        except Exception as e:
+            self.log(f"خطأ في كتابة ملف القياسات: {e}", level="error")
+
+    def _update_timings(self):
+        city = self.cfg.get("city")
+        place = self.city_place(city)
+        if place is None:
+            self.log("المدينة غير موجودة", level="warning")
+            return False
+
+        method = place.method
+
+        try:
+            clean_timings = self.store.get_day(city, method, self.city_today(place))
+            if clean_timings:
+                self.timings = clean_timings
+                self.save_config()
+                self.log(f"تم تحديث المواقيت للمدينة: {city}", event="timings_updated", city=city)
+                self.arm_scheduler()
+                # بعد بناء المواعيد حتى تجد الواجهة الصلاة القادمة
+                if self.on_timings_changed:
+                    self.on_timings_changed()
+                return True
+            else:
+                self.log("فشل في جلب المواقيت من الإنترنت", level="warning", event="timings_failed", city=city)
+                return False
+        except Exception as e:
+            self.log(f"خطأ في جلب المواقيت: {e}", level="error", event="timings_failed", city=city)
+            return False
+
+    def fetch_month(self, city, method, year, month):
+        place = self.city_place(city)
+        lat, lng, timezone = place.lat, place.lng, place.timezone
+
+        # الحساب المحلي هو الافتراضي، و"api" يرجع لموقع aladhan.com
+        if self.cfg.get("timings_source", "local") != "api":
+            import prayer_calc
+            return prayer_calc.month_table(lat, lng, method, timezone, year, month)
+        return self.fetcher.fetch_month(lat, lng, method, timezone, year, month)
+
+    def fetch_months(self, items):
+        if self.cfg.get("timings_source", "local") != "api":
+            return [self.fetch_month(*item) for item in items]
+        jobs = []
+        for city, method, year, month in items:
+            place = self.city_place(city)
+            jobs.append((place.lat, place.lng, method, place.timezone, year, month))
+        return self.fetcher.fetch_many(jobs)
+
+    def prefetch_timetable(self):
+        city = self.cfg.get("city")
+        place = self.city_place(city)
+        if place is None:
+            return
+        method = place.method
+        today = self.city_today(place)
+        try:
+            if self.cfg.get("timings_source", "local") == "api":
+                # طلب مشروط: إذا لم يتغير الشهر الحالي يرد الخادم 304 بدون تنزيل
+                if self.store.refresh(city, method, today.year, today.month):
+                    self.log("تم تحديث جدول الشهر الحالي من الإنترنت")
+                    self.update_timings()
+            fetched = self.store.prefetch(city, method, start=today, months=PREFETCH_MONTHS)
+            self.store.evict_stale(today)
+            if fetched:
+                self.log(f"تم تجهيز مواقيت {fetched} شهر مقدمًا للمدينة: {city}")
+        except Exception as e:
+            self.log(f"خطأ في تجهيز المواقيت مسبقًا: {e}", level="error", event="prefetch_failed")
+
+    def arm_scheduler(self):
+        # إعادة بناء مواعيد اليوم بعد أي تغيير في المواقيت أو المدينة
+        # المواقيت تتحول مرة واحدة إلى لحظات بتوقيت المدينة (مع التوقيت الصيفي)، والمؤقت يعمل على طوابع زمنية
+        self.scheduler.clear()
+        import prayer_calc
+        zone = self.city_zone()
+        now = datetime.now(zone)
+        today = now.date()
+        # عشاء الأمس قد يقع بعد منتصف الليل (خطوط العرض العليا) وما زال قادمًا عند بداية اليوم الجديد
+        pending = list(prayer_calc.day_instants(today - timedelta(days=1), self.yesterday_timings(today), zone).items())
+        pending += list(prayer_calc.day_instants(today, self.timings, zone).items())
+        for prayer, when in pending:
+            if when > now:
+                target = when.timestamp()
+                self.scheduler.schedule(target, prayer, self.on_prayer_due, prayer, target)
+                self.schedule_preroll(target, prayer)
+        midnight = datetime.combine(today + timedelta(days=1), datetime.min.time(), tzinfo=zone)
+        self.scheduler.schedule(midnight.timestamp(), "day_rollover", self.on_day_rollover)
+        for key, (handle, _) in list(self._playbacks.items()):
+            self.scheduler.schedule(handle.ends_at + PLAYBACK_DONE_MARGIN, key, self.on_playback_done, key)
+        for key, (_, _, expires) in list(self._prerolls.items()):
+            self.scheduler.schedule(expires, key, self.on_preroll_expired, key)
+        self.arm_sites(now.timestamp())
+
+    def yesterday_timings(self, today):
+        # من المخزن فقط بدون جلب، فلا يتأخر بناء المواعيد
+        place = self.city_place()
+        if place is None:
+            return {}
+        try:
+            return self.store.get_day(self.cfg.get("city"), place.method, today - timedelta(days=1), fetch=False) or {}
+        except Exception:
+            return {}
+
+    def arm_sites(self, now):
+        # مواعيد كل المواقع الإضافية (اليوم والغد بتوقيت كل موقع) في نفس طابور المؤقتات
+        try:
+            for site, prayer, when in compute_deadlines(self.sites, now):
+                self.scheduler.schedule(when, (site.name, prayer), self.on_site_prayer_due, site, prayer, when)
+                self.schedule_preroll(when, prayer, site)
+        except Exception as e:
+            self.log(f"خطأ في حساب مواقيت المواقع: {e}", level="error")
+
+    def on_site_prayer_due(self, site, prayer, target):
+        # للمواقع صوتها الخاص، فتُطبق من السياسة المدة والتدرج فقط
+        wake = time.time()
+        policy = self.playback_policy(prayer)
+        player = self.site_player(site)
+        handle = self.start_playback(player, policy)
+        record = self.metrics.prayer_fired(prayer, target, wake, time.time(), site=site.name)
+        self.preroll_used(player)
+        self.log(f"[{site.name}] موعد صلاة {PRAYER_NAMES_AR.get(prayer, prayer)} الآن، {self.describe_policy(policy)}",
+                 event="prayer_due", site=site.name, prayer=prayer, mode=policy["mode"],
+                 wake_delay=round(record["wake_delay"], 3))
+        self.watch_playback(handle, record)
+
+    def on_prayer_due(self, prayer, target):
+        # التشغيل أولًا ثم التسجيل، حتى لا يتأخر الصوت بسبب السجل أو القياسات
+        wake = time.time()
+        policy = self.playback_policy(prayer)
+        player = self.prayer_player(policy)
+        handle = self.start_playback(player, policy)
+        record = self.metrics.prayer_fired(prayer, target, wake, time.time())
+        self.preroll_used(player)
+        self.log(f"موعد صلاة {PRAYER_NAMES_AR.get(prayer, prayer)} الآن، {self.describe_policy(policy)}",
+                 event="prayer_due", prayer=prayer, mode=policy["mode"], wake_delay=round(record["wake_delay"], 3))
+        self.watch_playback(handle, record)
+
+    def on_prayer_missed(self, key, when, late):
+        if key == "day_rollover":
+            self.on_day_rollover()
+            return
+        if isinstance(key, tuple) and key[0] == "playback_done":
+            self.on_playback_done(key)
+            return
+        if isinstance(key, tuple) and key[0] == "preroll":
+            return
+        if isinstance(key, tuple) and key[0] == "preroll_expire":
+            self.on_preroll_expired(key)
+            return
+        if isinstance(key, tuple):
+            site_name, prayer = key
+            self.metrics.prayer_missed(prayer, site=site_name)
+            self.export_metrics()
+            self.log(f"[{site_name}] فات موعد صلاة {PRAYER_NAMES_AR.get(prayer, prayer)} بـ {int(late)} ثانية",
+                     level="warning", event="prayer_missed", site=site_name, prayer=prayer, late=round(late, 1))
+            return
+        self.metrics.prayer_missed(key)
+        self.export_metrics()
+        self.log(f"فات موعد صلاة {PRAYER_NAMES_AR.get(key, key)} بـ {int(late)} ثانية (ربما كان الجهاز في وضع السكون)",
+                 level="warning", event="prayer_missed", prayer=key, late=round(late, 1))
+
+    def on_clock_jump(self, jump):
+        # تغيرت ساعة النظام (تعديل يدوي أو NTP أو استيقاظ من السكون): اليوم نفسه قد تغير فنعيد حساب كل شيء
+        self.log(f"تغيرت ساعة النظام بمقدار {jump:+.0f} ثانية، إعادة حساب المواعيد",
+                 level="warning", event="clock_jump", jump=round(jump, 1))
+        self.metrics.inc("adhan_clock_jumps_total")
+        # المواعيد الحالية أعاد المؤقت حسابها من لحظاتها الحقيقية، فتبقى صالحة حتى ينتهي التحديث
+        self.run_in_worker(self.refresh_after_clock_jump)
+
+    def refresh_after_clock_jump(self):
+        if not self.update_timings():
+            self.arm_scheduler()
+
+    def on_day_rollover(self):
+        # إعادة تحديث التواقيت في بداية كل يوم تلقائيًا
+        self.run_in_worker(self.refresh_after_rollover)
+
+    def refresh_after_rollover(self):
+        if not self.update_timings():
+            self.scheduler.schedule(time.time() + ROLLOVER_RETRY, "day_rollover", self.on_day_rollover)
+
+    def run_in_worker(self, fn, *args):
+        def run():
+            if not self.is_running:
+                return
+            try:
+                fn(*args)
+            except Exception as e:
+                self.log(f"خطأ في تحديث المواقيت: {e}", level="error", event="timings_failed")
+        try:
+            self.worker.submit(run)
+        except RuntimeError:
+            # الخدمة أُوقفت
+            pass
+
+    def update_timings_loop(self):
+        while self.is_running:
+            success = self.update_timings()
+            self.prefetch_timetable()
+            interval = OFFLINE_UPDATE_INTERVAL if success else FAILED_UPDATE_INTERVAL
+            if self._stop_event.wait(interval):
+                break
+
+    def control_token(self):
+        # رمز خاص بهذا التثبيت تطلبه واجهة التحكم (daemon.py) في طلبات POST، يُنشأ مرة ويُحفظ في config.json
+        token = self.cfg.get("control_token")
+        if not isinstance(token, str) or not token:
+            token = self.cfg["control_token"] = secrets.token_urlsafe(32)
+            self.save_config()
+            self.config_store.flush()
+        return token
+
+    def start_updater(self):
+        self.updater_thread = threading.Thread(target=self.update_timings_loop, daemon=True)
+        self.updater_thread.start()
+
+    def start_app_updater(self):
+        # خيط منفصل بسرعة محدودة، ويتوقف التنزيل أثناء تشغيل الأذان
+        if not self.cfg.get("auto_update", False):
+            return
+        self.app_updater = Updater(
+            manifest_url=self.cfg.get("update_url", UPDATE_MANIFEST_URL),
+            rate_limit=self.cfg.get("update_rate_limit", UPDATE_RATE_LIMIT) * 1024,
+            busy=self.is_playing, log=self.log,
+        )
+        self.app_updater.start()
+
+    def start_scheduler(self):
+        self.scheduler.start()
+        self.arm_scheduler()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# مواقع إضافية (قاعات/مساجد) تُدار من نفس البرنامج: لكل موقع إحداثياته وطريقة حسابه
+# ومنطقته الزمنية وصوت الأذان وجهاز الإخراج، وكل المواعيد في طابور مؤقتات واحد.
+# مثال في config.json:
+#   "sites": [
+#     {"name": "القاعة الكبرى", "city": "القاهرة", "output_device": "3 - Speakers"},
+#     {"name": "مسجد الحي", "city": "Leeds (GB)"},   (أي مكان من فهرس الأماكن places.idx)
+#     {"name": "المصلى", "lat": 21.42, "lng": 39.82, "timezone": "Asia/Riyadh", "method": 4, "adhan": "adhan2.mp3"}
+#   ]
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from prayer_data import VALID_PRAYERS
+from places import find_place
+
+
+class Site:
+    __slots__ = ("name", "lat", "lng", "timezone", "method", "adhan", "output_device", "volume", "timings", "player")
+
+    def __init__(self, name, lat, lng, timezone, method, adhan, output_device=None, volume=0.8):
+        self.name = name
+        self.lat = lat
+        self.lng = lng
+        self.timezone = timezone
+        self.method = method
+        self.adhan = adhan
+        self.output_device = output_device
+        self.volume = volume
+        self.timings = {}
+        self.player = None
+
+    @classmethod
+    def from_config(cls, entry, default_adhan, default_volume):
+        name = entry.get("name")
+        if not name:
+            raise ValueError("الموقع بدون اسم")
+        city = entry.get("city")
+        if city is not None:
+            place = find_place(city)
+            if place is None:
+                raise ValueError(f"المدينة غير موجودة: {city}")
+            lat, lng, timezone, method = place.lat, place.lng, place.timezone, place.method
+        else:
+            lat, lng = float(entry["lat"]), float(entry["lng"])
+            timezone = "UTC"
+            method = 2
+        timezone = entry.get("timezone", timezone)
+        ZoneInfo(timezone)
+        return cls(
+            name,
+            float(entry.get("lat", lat)),
+            float(entry.get("lng", lng)),
+            timezone,
+            int(entry.get("method", method)),
+            entry.get("adhan", default_adhan),
+            entry.get("output_device"),
+            float(entry.get("volume", default_volume)),
+        )
+
+    def local_today(self, now):
+        return datetime.fromtimestamp(now, ZoneInfo(self.timezone)).date()
+
+
+def load_sites(entries, default_adhan, default_volume, log):
+    sites = []
+    names = set()
+    for entry in entries or []:
+        try:
+            site = Site.from_config(entry, default_adhan, default_volume)
+        except Exception as e:
+            log(f"تم تجاهل موقع غير صالح في الإعدادات: {e}")
+            continue
+        if site.name in names:
+            log(f"تم تجاهل موقع مكرر: {site.name}")
+            continue
+        names.add(site.name)
+        sites.append(site)
+    return sites
+
+
+def compute_deadlines(sites, now, days=2):
+    # حساب مواقيت كل المواقع لليوم والغد (بتوقيت كل موقع) باستدعاء NumPy واحد، ومعها الأمس
+    # لأن عشاءه قد يقع بعد منتصف الليل (خطوط العرض العليا)
+    # النتيجة: [(site, prayer, timestamp), ...] للمواعيد القادمة فقط
+    if not sites:
+        return []
+    import numpy as np
+    import prayer_calc
+
+    day_lists = []
+    offsets = []
+    for site in sites:
+        first = site.local_today(now)
+        site_days = [first + timedelta(days=i) for i in range(-1, days)]
+        day_lists.append(site_days)
+        offsets.append(prayer_calc.utc_offsets_for(site.timezone, site_days))
+
+    lat = np.array([s.lat for s in sites])[:, None]
+    lng = np.array([s.lng for s in sites])[:, None]
+    methods = np.array([s.method for s in sites])[:, None]
+    dates = np.array(day_lists, dtype="datetime64[D]")
+    minutes = prayer_calc.compute_minutes(lat, lng, dates, methods, np.array(offsets))
+
+    deadlines = []
+    for site, site_days, site_minutes in zip(sites, day_lists, minutes):
+        tz = ZoneInfo(site.timezone)
+        site.timings = {p: prayer_calc.minutes_to_str(m) for p, m in zip(VALID_PRAYERS, site_minutes[1])}
+        for day, row in zip(site_days, site_minutes):
+            timings = {p: prayer_calc.minutes_to_str(m) for p, m in zip(VALID_PRAYERS, row)}
+            for prayer, when in prayer_calc.day_instants(day, timings, tz).items():
+                when = when.timestamp()
+                if when > now:
+                    deadlines.append((site, prayer, when))
+    return deadlines
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+# حفظ config.json في الخلفية (config_store.py): آخر نسخة محفوظة هي دائمًا التي تبقى على القرص
+# حتى مع flush() من خيوط أخرى أثناء عمل خيط الحفظ.
+# الاستخدام: python -m pytest tests
+import os
+import sys
+import json
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config_store import ConfigStore
+
+
+def test_flush_writes_latest(tmp_path):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore(path, delay=60)
+    store.save({"volume": 0.5})
+    store.save({"volume": 0.7})
+    store.flush()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"volume": 0.7}
+    store.close()
+
+
+def test_concurrent_flush_never_writes_older_data(tmp_path):
+    path = str(tmp_path / "config.json")
+    store = ConfigStore(path, delay=0)
+    lock = threading.Lock()
+    counter = [0]
+
+    def saver():
+        for _ in range(300):
+            with lock:
+                counter[0] += 1
+                store.save({"n": counter[0]})
+
+    def flusher():
+        for _ in range(300):
+            store.flush()
+
+    threads = [threading.Thread(target=saver) for _ in range(2)] + [threading.Thread(target=flusher) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    store.close()
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"n": counter[0]}
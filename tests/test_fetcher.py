@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# سلوك TimingsFetcher أمام خادم محلي (benchmarks/stub_server.py) بدون إنترنت:
+# إعادة المحاولة عند 503، احترام Retry-After وحده الأقصى، الطلبات المشروطة (ETag/304)
+# وبقاؤها بعد إعادة التشغيل، والتوقف بعد آخر محاولة.
+# الاستخدام: python -m pytest tests
+import os
+import sys
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fetcher import TimingsFetcher, FetchError, VALIDATORS_FILE
+from stub_server import StubServer
+
+MAKKAH = (21.4225, 39.8262, 4, "Asia/Riyadh")
+
+
+def make_fetcher(stub, **kwargs):
+    kwargs.setdefault("backoff_base", 0.01)
+    kwargs.setdefault("backoff_max", 0.05)
+    return TimingsFetcher(url=stub.calendar_url, **kwargs)
+
+
+def test_retries_after_503():
+    with StubServer(fail_first=2) as stub:
+        fetcher = make_fetcher(stub)
+        days = fetcher.fetch_month(*MAKKAH, 2024, 8)
+        fetcher.close()
+    assert len(days) == 31
+    assert days["2024-08-01"]["Fajr"] == "04:31"
+    assert stub.failures == 2
+    assert fetcher.stats["retries"] == 2
+    assert fetcher.stats["failures"] == 0
+
+
+def test_backoff_honours_retry_after():
+    with StubServer(fail_first=2, retry_after=0.2) as stub:
+        fetcher = make_fetcher(stub, backoff_max=1.0)
+        start = time.monotonic()
+        fetcher.fetch_month(*MAKKAH, 2024, 8)
+        elapsed = time.monotonic() - start
+        fetcher.close()
+    assert elapsed >= 0.4
+
+
+def test_backoff_is_capped():
+    # Retry-After أطول من backoff_max لا يؤخر أكثر من الحد
+    with StubServer(fail_first=2, retry_after=30) as stub:
+        fetcher = make_fetcher(stub, backoff_max=0.05)
+        start = time.monotonic()
+        fetcher.fetch_month(*MAKKAH, 2024, 8)
+        elapsed = time.monotonic() - start
+        fetcher.close()
+    assert elapsed < 5
+
+
+def test_gives_up_after_max_retries():
+    with StubServer(fail_first=100) as stub:
+        fetcher = make_fetcher(stub, retries=2)
+        with pytest.raises(FetchError):
+            fetcher.fetch_month(*MAKKAH, 2024, 8)
+        fetcher.close()
+    assert stub.requests == 3
+    assert fetcher.stats["failures"] == 1
+    assert fetcher.stats["retries"] == 2
+
+
+def test_fetch_many_returns_none_for_failed_months():
+    with StubServer(fail_first=100) as stub:
+        fetcher = make_fetcher(stub, retries=0)
+        assert fetcher.fetch_many([MAKKAH + (2024, 8), MAKKAH + (2024, 9)]) == [None, None]
+        fetcher.close()
+
+
+def test_revalidates_with_etag():
+    with StubServer() as stub:
+        fetcher = make_fetcher(stub)
+        first = fetcher.fetch_month(*MAKKAH, 2024, 8)
+        second = fetcher.fetch_month(*MAKKAH, 2024, 8)
+        fetcher.close()
+    assert second == first
+    assert stub.not_modified == 1
+    assert fetcher.stats["not_modified"] == 1
+
+
+def test_validators_survive_restart(tmp_path):
+    year, month = 2099, 1     # شهر قادم حتى لا يُحذف كشهر منتهٍ
+    with StubServer() as stub:
+        fetcher = make_fetcher(stub, cache_dir=str(tmp_path))
+        first = fetcher.fetch_month(*MAKKAH, year, month)
+        fetcher.close()
+        assert (tmp_path / VALIDATORS_FILE).exists()
+
+        restarted = make_fetcher(stub, cache_dir=str(tmp_path))
+        second = restarted.fetch_month(*MAKKAH, year, month)
+        restarted.close()
+    assert second == first
+    assert stub.not_modified == 1
+    assert restarted.stats["not_modified"] == 1
+
+
+def test_stale_validators_are_pruned(tmp_path):
+    with StubServer() as stub:
+        fetcher = make_fetcher(stub, cache_dir=str(tmp_path))
+        fetcher.fetch_month(*MAKKAH, 2000, 1)
+        fetcher.fetch_month(*MAKKAH, 2099, 1)
+        fetcher.close()
+    restarted = TimingsFetcher(url=stub.calendar_url, cache_dir=str(tmp_path))
+    restarted._load_validators()
+    assert [key[-2:] for key in restarted._validators] == [(2099, 1)]
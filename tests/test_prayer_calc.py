@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# مطابقة prayer_calc.month_table لمرجع PrayTimes 2.3 حتى الدقيقة.
+# كل حالة: المدينة، الإحداثيات، رقم الطريقة، المنطقة الزمنية، السنة، الشهر، وأيام من الجدول المتوقع.
+# أوسلو في يونيو تختبر تصحيح خطوط العرض العليا (الفجر والعشاء بلا زاوية حقيقية).
+# مكة في مارس وأبريل 2024 تختبر عشاء أم القرى في رمضان 1445 (120 دقيقة بدل 90) وحدود الشهر.
+# القيم محسوبة بنسخة مستقلة (قيمة بقيمة) من PrayTimes 2.3 بإعداداتها الافتراضية (الشافعي، تصحيح بالزاوية)،
+# وليست ردودًا مسجلة من aladhan: هذا الاختبار يكشف أي انحراف في الحساب المتجه عن الخوارزمية المرجعية،
+# ولا يثبت التطابق مع الخدمة نفسها.
+# الاستخدام: python -m pytest tests
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import prayer_calc
+
+CALENDAR_DAYS = [
+    ("Makkah", 21.4225, 39.8262, 4, "Asia/Riyadh", 2024, 8, {
+        "2024-08-01": {"Fajr": "04:31", "Dhuhr": "12:27", "Asr": "15:46", "Maghrib": "19:00", "Isha": "20:30"},
+        "2024-08-15": {"Fajr": "04:39", "Dhuhr": "12:25", "Asr": "15:47", "Maghrib": "18:51", "Isha": "20:21"},
+        "2024-08-31": {"Fajr": "04:46", "Dhuhr": "12:21", "Asr": "15:46", "Maghrib": "18:38", "Isha": "20:08"},
+    }),
+    ("Makkah", 21.4225, 39.8262, 4, "Asia/Riyadh", 2024, 3, {
+        "2024-03-10": {"Fajr": "05:18", "Dhuhr": "12:31", "Asr": "15:54", "Maghrib": "18:28", "Isha": "19:58"},
+        "2024-03-11": {"Fajr": "05:17", "Dhuhr": "12:31", "Asr": "15:54", "Maghrib": "18:29", "Isha": "20:29"},
+        "2024-03-25": {"Fajr": "05:04", "Dhuhr": "12:27", "Asr": "15:52", "Maghrib": "18:33", "Isha": "20:33"},
+    }),
+    ("Makkah", 21.4225, 39.8262, 4, "Asia/Riyadh", 2024, 4, {
+        "2024-04-09": {"Fajr": "04:49", "Dhuhr": "12:22", "Asr": "15:47", "Maghrib": "18:38", "Isha": "20:38"},
+        "2024-04-10": {"Fajr": "04:48", "Dhuhr": "12:22", "Asr": "15:47", "Maghrib": "18:39", "Isha": "20:09"},
+    }),
+    ("Cairo", 30.0444, 31.2357, 5, "Africa/Cairo", 2024, 7, {
+        "2024-07-01": {"Fajr": "04:12", "Dhuhr": "12:59", "Asr": "16:35", "Maghrib": "20:00", "Isha": "21:33"},
+        "2024-07-15": {"Fajr": "04:21", "Dhuhr": "13:01", "Asr": "16:37", "Maghrib": "19:58", "Isha": "21:28"},
+        "2024-07-31": {"Fajr": "04:35", "Dhuhr": "13:01", "Asr": "16:38", "Maghrib": "19:49", "Isha": "21:16"},
+    }),
+    ("Istanbul", 41.0082, 28.9784, 13, "Europe/Istanbul", 2024, 12, {
+        "2024-12-01": {"Fajr": "06:32", "Dhuhr": "12:53", "Asr": "15:18", "Maghrib": "17:36", "Isha": "19:09"},
+        "2024-12-21": {"Fajr": "06:46", "Dhuhr": "13:02", "Asr": "15:21", "Maghrib": "17:39", "Isha": "19:13"},
+        "2024-12-31": {"Fajr": "06:50", "Dhuhr": "13:07", "Asr": "15:28", "Maghrib": "17:46", "Isha": "19:19"},
+    }),
+    ("New York", 40.7128, -74.006, 2, "America/New_York", 2024, 11, {
+        "2024-11-01": {"Fajr": "06:10", "Dhuhr": "12:40", "Asr": "15:28", "Maghrib": "17:52", "Isha": "19:08"},
+        "2024-11-02": {"Fajr": "06:11", "Dhuhr": "12:40", "Asr": "15:27", "Maghrib": "17:50", "Isha": "19:07"},
+        "2024-11-03": {"Fajr": "05:12", "Dhuhr": "11:40", "Asr": "14:26", "Maghrib": "16:49", "Isha": "18:06"},
+        "2024-11-30": {"Fajr": "05:39", "Dhuhr": "11:45", "Asr": "14:11", "Maghrib": "16:29", "Isha": "17:50"},
+    }),
+    ("Oslo", 59.9139, 10.7522, 2, "Europe/Oslo", 2024, 6, {
+        "2024-06-01": {"Fajr": "02:41", "Dhuhr": "13:15", "Asr": "17:52", "Maghrib": "22:24", "Isha": "23:50"},
+        "2024-06-21": {"Fajr": "02:36", "Dhuhr": "13:19", "Asr": "18:01", "Maghrib": "22:44", "Isha": "00:01"},
+        "2024-06-30": {"Fajr": "02:40", "Dhuhr": "13:21", "Asr": "18:01", "Maghrib": "22:41", "Isha": "00:01"},
+    }),
+    ("Oslo", 59.9139, 10.7522, 13, "Europe/Oslo", 2024, 6, {
+        "2024-06-01": {"Fajr": "02:24", "Dhuhr": "13:15", "Asr": "17:52", "Maghrib": "22:24", "Isha": "00:01"},
+        "2024-06-21": {"Fajr": "02:21", "Dhuhr": "13:19", "Asr": "18:01", "Maghrib": "22:44", "Isha": "00:12"},
+        "2024-06-30": {"Fajr": "02:24", "Dhuhr": "13:21", "Asr": "18:01", "Maghrib": "22:41", "Isha": "00:12"},
+    }),
+]
+
+
+@pytest.mark.parametrize(
+    "city, lat, lng, method, timezone, year, month, expected",
+    CALENDAR_DAYS,
+    ids=[f"{c[0]}-method{c[3]}-{c[5]}-{c[6]:02d}" for c in CALENDAR_DAYS],
+)
+def test_month_table_matches_praytimes_reference(city, lat, lng, method, timezone, year, month, expected):
+    table = prayer_calc.month_table(lat, lng, method, timezone, year, month)
+    diff = []
+    for day, timings in expected.items():
+        for prayer, want in timings.items():
+            got = table.get(day, {}).get(prayer)
+            if got != want:
+                diff.append(f"{day} {prayer}: المرجع {want}, prayer_calc {got}")
+    if diff:
+        pytest.fail(f"{city} (method {method}) لا يطابق مرجع PrayTimes:\n" + "\n".join(diff))
+
+
+def test_hijri_dates_ramadan_1445():
+    import numpy as np
+    dates = np.array(["2024-03-10", "2024-03-11", "2024-04-09", "2024-04-10"], dtype="datetime64[D]")
+    year, month, day = prayer_calc.hijri_dates(dates)
+    assert list(zip(year, month, day)) == [(1445, 8, 29), (1445, 9, 1), (1445, 9, 30), (1445, 10, 1)]
+
+
+def test_day_instants_moves_isha_after_midnight_to_next_day():
+    from datetime import date
+    from zoneinfo import ZoneInfo
+    timings = {"Fajr": "02:21", "Dhuhr": "13:19", "Asr": "18:01", "Maghrib": "22:44", "Isha": "00:12"}
+    instants = prayer_calc.day_instants(date(2024, 6, 21), timings, ZoneInfo("Europe/Oslo"))
+    assert instants["Maghrib"].isoformat() == "2024-06-21T22:44:00+02:00"
+    assert instants["Isha"].isoformat() == "2024-06-22T00:12:00+02:00"
+
+
+def test_site_deadlines_keep_yesterdays_isha_after_midnight():
+    # بعد منتصف الليل مباشرة: عشاء 21 يونيو (00:12) ما زال قادمًا ويجب جدولته
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+    from sites import Site, compute_deadlines
+    site = Site("Oslo", 59.9139, 10.7522, "Europe/Oslo", 13, "adhan1.mp3")
+    now = datetime(2024, 6, 22, 0, 5, tzinfo=ZoneInfo("Europe/Oslo")).timestamp()
+    deadlines = [(prayer, datetime.fromtimestamp(when, ZoneInfo("Europe/Oslo")).strftime("%m-%d %H:%M"))
+                 for _, prayer, when in compute_deadlines([site], now)]
+    assert deadlines[0] == ("Isha", "06-22 00:12")
+    assert [d for d in deadlines if d[0] == "Isha"] == [("Isha", "06-22 00:12"), ("Isha", "06-23 00:12"),
+                                                       ("Isha", "06-24 00:12")]
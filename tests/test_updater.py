@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+# التحديث التلقائي (updater.py) أمام خادم محلي (benchmarks/stub_server.py) بدون إنترنت:
+# الاستكمال بـ Range بعد انقطاع الاتصال، رفض الملف عند اختلاف البصمة أو الحجم،
+# رفض ملف إصدار بدون sha256، وتثبيت التحديث المجهز عند بدء البرنامج.
+# الاستخدام: python -m pytest tests
+import os
+import sys
+import json
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from updater import Updater, UpdateError, STAGED_FILE, install_staged, sha256_file
+from stub_server import StubServer
+
+RELEASE = bytes(range(256)) * 1200      # ~300 كيلوبايت
+
+
+def make_updater(stub, directory):
+    return Updater(manifest_url=stub.manifest_url, version="1.0.1", directory=str(directory),
+                   rate_limit=0, jitter=0, chunk_size=16 * 1024, log=lambda message, **fields: None)
+
+
+def test_resumes_with_range_after_dropped_connection(tmp_path):
+    with StubServer() as stub:
+        stub.publish("1.0.2", RELEASE)
+        stub.cut_after = 100000
+        updater = make_updater(stub, tmp_path)
+        with pytest.raises(UpdateError):
+            updater.run_once()
+        assert updater.staged() is None
+
+        staged = updater.run_once()
+    assert staged["version"] == "1.0.2"
+    assert updater.state == "staged"
+    assert stub.range_requests == 1
+    assert stub.bytes_sent < 2 * len(RELEASE)
+    assert sha256_file(tmp_path / staged["file"]) == stub.manifest["sha256"]
+    assert sorted(os.listdir(tmp_path)) == sorted([STAGED_FILE, staged["file"]])
+
+
+def test_rejects_sha256_mismatch(tmp_path):
+    with StubServer() as stub:
+        stub.publish("1.0.2", RELEASE)
+        stub.manifest["sha256"] = "0" * 64
+        updater = make_updater(stub, tmp_path)
+        with pytest.raises(UpdateError):
+            updater.run_once()
+    assert updater.staged() is None
+    # الملف المرفوض لا يبقى ليُستكمل
+    assert os.listdir(tmp_path) == []
+
+
+def test_rejects_size_mismatch(tmp_path):
+    with StubServer() as stub:
+        stub.publish("1.0.2", RELEASE)
+        stub.manifest["size"] = len(RELEASE) + 1
+        updater = make_updater(stub, tmp_path)
+        with pytest.raises(UpdateError):
+            updater.run_once()
+    assert updater.staged() is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_refuses_manifest_without_hash(tmp_path):
+    with StubServer() as stub:
+        stub.publish("1.0.2", RELEASE)
+        stub.manifest["sha256"] = ""
+        updater = make_updater(stub, tmp_path)
+        with pytest.raises(UpdateError):
+            updater.run_once()
+    # فقط طلب version.json، بدون تنزيل الملف
+    assert stub.requests == 1
+    assert stub.bytes_sent == 0
+    assert updater.staged() is None
+
+
+def test_skips_download_while_staged(tmp_path):
+    with StubServer() as stub:
+        stub.publish("1.0.2", RELEASE)
+        updater = make_updater(stub, tmp_path)
+        updater.run_once()
+        sent = stub.bytes_sent
+        assert updater.run_once()["version"] == "1.0.2"
+    assert stub.bytes_sent == sent
+
+
+def test_install_staged_replaces_target(tmp_path):
+    with StubServer() as stub:
+        stub.publish("99.0.0", RELEASE)
+        updates = tmp_path / "updates"
+        make_updater(stub, updates).run_once()
+    target = tmp_path / "adhan.exe"
+    target.write_bytes(b"old")
+    assert install_staged(str(updates), target=str(target), log=lambda message: None)
+    assert target.read_bytes() == RELEASE
+    assert (tmp_path / "adhan.exe.old").read_bytes() == b"old"
+    assert not os.path.exists(updates / STAGED_FILE)
+    # لا شيء لتثبيته في المرة التالية، والملف القديم يُحذف
+    assert not install_staged(str(updates), target=str(target), log=lambda message: None)
+    assert not os.path.exists(tmp_path / "adhan.exe.old")
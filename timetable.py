@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# مخزن مواقيت لعدة أيام على القرص: ملف JSON لكل (مدينة، طريقة حساب، شهر)
+# مع نسخة في الذاكرة محدودة الحجم (LRU) حتى يكون تغيّر اليوم مجرد بحث بدون قراءة/كتابة.
+# ملفات السنة الثنائية (*.adtt من timetable_pack.py) في نفس المجلد تُقرأ أولًا عبر mmap.
+import os
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+
+TIMETABLE_DIR = "timetable"
+MAX_MONTHS_IN_MEMORY = 24
+
+
+def month_key(day):
+    return day.year, day.month
+
+
+def add_months(year, month, n):
+    index = year * 12 + (month - 1) + n
+    return index // 12, index % 12 + 1
+
+
+class TimetableStore:
+    def __init__(self, provider, directory=TIMETABLE_DIR, max_months=MAX_MONTHS_IN_MEMORY, batch_provider=None, use_packs=True):
+        # provider(city, method, year, month) -> {"YYYY-MM-DD": {"Fajr": "HH:MM", ...}} أو None
+        # batch_provider([(city, method, year, month), ...]) -> [الأيام أو None, ...] لجلب عدة أشهر معًا
+        self.provider = provider
+        self.batch_provider = batch_provider
+        self.directory = directory
+        self.max_months = max_months
+        self._months = OrderedDict()
+        self._lock = threading.Lock()
+        self.use_packs = use_packs
+        self._packs = None
+
+    def packs(self):
+        # فتح ملفات السنة عند أول بحث فقط
+        with self._lock:
+            if self._packs is None:
+                if not self.use_packs:
+                    return []
+                from timetable_pack import open_packs
+                self._packs = open_packs(self.directory)
+            return self._packs
+
+    def reload_packs(self):
+        with self._lock:
+            old, self._packs = self._packs, None
+        for pack in old or []:
+            pack.close()
+
+    def close(self):
+        self.reload_packs()
+
+    def _path(self, city, method, year, month):
+        safe_city = "".join(c if c.isalnum() else "_" for c in city)
+        return os.path.join(self.directory, f"{safe_city}_{method}_{year}-{month:02d}.json")
+
+    def _remember(self, key, days):
+        self._months[key] = days
+        self._months.move_to_end(key)
+        while len(self._months) > self.max_months:
+            self._months.popitem(last=False)
+
+    def _load_month(self, city, method, year, month, fetch=True):
+        key = (city, method, year, month)
+        with self._lock:
+            days = self._months.get(key)
+            if days is not None:
+                self._months.move_to_end(key)
+                return days
+
+        path = self._path(city, method, year, month)
+        days = None
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    days = json.load(f)
+            except Exception:
+                days = None
+
+        if days is None and fetch:
+            days = self.provider(city, method, year, month)
+            if days:
+                self._write(path, days)
+
+        if days:
+            with self._lock:
+                self._remember(key, days)
+        return days
+
+    def put_month(self, city, method, year, month, days):
+        self._write(self._path(city, method, year, month), days)
+        with self._lock:
+            self._remember((city, method, year, month), days)
+
+    def _write(self, path, days):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(days, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def get_day(self, city, method, day, fetch=True):
+        for pack in self.packs():
+            timings = pack.get(city, method, day)
+            if timings:
+                return timings
+        days = self._load_month(city, method, day.year, day.month, fetch=fetch)
+        if not days:
+            return None
+        return days.get(day.isoformat())
+
+    def has_month(self, city, method, year, month):
+        if (city, method, year, month) in self._months or os.path.exists(self._path(city, method, year, month)):
+            return True
+        return any(pack.covers(city, method, year, month) for pack in self.packs())
+
+    def prefetch(self, city, method, start=None, months=12):
+        # تحميل عدة أشهر مقدمًا، ويعيد عدد الأشهر الجديدة التي تم جلبها
+        start = start or date.today()
+        missing = []
+        for i in range(months):
+            year, month = add_months(start.year, start.month, i)
+            if not self.has_month(city, method, year, month):
+                missing.append((city, method, year, month))
+        if not missing:
+            return 0
+
+        if self.batch_provider and len(missing) > 1:
+            results = self.batch_provider(missing)
+        else:
+            results = [self.provider(*item) for item in missing]
+        fetched = 0
+        for item, days in zip(missing, results):
+            if days:
+                self.put_month(*item, days)
+                fetched += 1
+        return fetched
+
+    def refresh(self, city, method, year, month):
+        # إعادة التحقق من شهر محفوظ، ويعيد True إذا تغيرت بياناته
+        current = self._load_month(city, method, year, month, fetch=False)
+        days = self.provider(city, method, year, month)
+        if not days or days == current:
+            return False
+        self.put_month(city, method, year, month, days)
+        return True
+
+    def evict_stale(self, today=None):
+        # حذف الأشهر المنتهية من الذاكرة والقرص
+        today = today or date.today()
+        current = month_key(today)
+        with self._lock:
+            for key in [k for k in self._months if (k[2], k[3]) < current]:
+                del self._months[key]
+
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                year, month = map(int, name[:-5].rsplit("_", 1)[1].split("-"))
+            except ValueError:
+                continue
+            if (year, month) < current:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+# ملف مواقيت ثنائي مضغوط لسنة كاملة (أو أكثر) لعدة مدن، للأجهزة غير المتصلة بالإنترنت.
+# البنية (little-endian):
+#   الرأس:    "ADTT" | الإصدار | عدد المدن | المصدر (local/api) | أول يوم (ordinal) | عدد الأيام
+#   الفهرس:   لكل مدينة: الاسم (UTF-8) | المنطقة الزمنية | طريقة الحساب
+#   البيانات: uint16 دقائق منذ منتصف الليل، [مدينة][يوم][5 صلوات]، و0xFFFF ليوم غير متوفر
+# القراءة عبر mmap: البحث عن يوم = حساب إزاحة وقراءة 10 بايت فقط.
+#
+# الاستخدام:
+#   python timetable_pack.py generate --year 2027 [--city الرياض ...] [--out timetable/2027.adtt]
+#   python timetable_pack.py export --year 2027 --city الرياض [--out ...]   (من جداول timetable/*.json)
+#   python timetable_pack.py import ملف.adtt                               (نسخه إلى مجلد timetable)
+#   python timetable_pack.py show ملف.adtt [--city الرياض] [--date 2027-03-01]
+import os
+import sys
+import mmap
+import shutil
+import struct
+import argparse
+from datetime import date, timedelta
+
+from prayer_data import CITIES, VALID_PRAYERS
+from places import find_place
+
+PACK_MAGIC = b"ADTT"
+PACK_VERSION = 1
+PACK_SUFFIX = ".adtt"
+HEADER = struct.Struct("<4sHH8sIHH")      # magic, version, cities, source, start, days, محجوز
+CITY_ENTRY = struct.Struct("<64s32sH")    # الاسم، المنطقة الزمنية، طريقة الحساب
+DAY_ROW = struct.Struct("<5H")
+MISSING = 0xFFFF
+
+
+class PackError(Exception):
+    pass
+
+
+def _text(raw):
+    return raw.rstrip(b"\0").decode("utf-8")
+
+
+def _fixed(text, size):
+    raw = text.encode("utf-8")
+    if len(raw) > size:
+        raise PackError(f"النص أطول من المسموح: {text}")
+    return raw
+
+
+def write_pack(path, entries, start, days, source="local"):
+    # entries: [(city, timezone, method, rows)] و rows: days صفًا من 5 دقائق (أو None لليوم الناقص)
+    out = bytearray(HEADER.pack(PACK_MAGIC, PACK_VERSION, len(entries), _fixed(source, 8), start.toordinal(), days, 0))
+    for city, timezone, method, _ in entries:
+        out += CITY_ENTRY.pack(_fixed(city, 64), _fixed(timezone, 32), method)
+    for _, _, _, rows in entries:
+        for row in rows:
+            if row is None:
+                row = (MISSING,) * 5
+            out += DAY_ROW.pack(*(int(m) for m in row))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(out)
+    os.replace(tmp_path, path)
+    return len(out)
+
+
+class TimetablePack:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count, source, start, days, _ = HEADER.unpack_from(self._map, 0)
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise PackError(f"ملف مواقيت غير معروف: {path}")
+            self.source = _text(source)
+            self.start = date.fromordinal(start)
+            self.days = days
+            self.cities = {}    # (city, method) -> (رقم المدينة، المنطقة الزمنية)
+            offset = HEADER.size
+            for i in range(count):
+                name, timezone, method = CITY_ENTRY.unpack_from(self._map, offset)
+                self.cities[(_text(name), method)] = (i, _text(timezone))
+                offset += CITY_ENTRY.size
+            self._data = offset
+            if len(self._map) < offset + count * days * DAY_ROW.size:
+                raise PackError(f"ملف مواقيت ناقص: {path}")
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def end(self):
+        return self.start + timedelta(days=self.days - 1)
+
+    def get_minutes(self, city, method, day):
+        entry = self.cities.get((city, method))
+        if entry is None:
+            return None
+        i = (day - self.start).days
+        if not 0 <= i < self.days:
+            return None
+        row = DAY_ROW.unpack_from(self._map, self._data + (entry[0] * self.days + i) * DAY_ROW.size)
+        return None if row[0] == MISSING else row
+
+    def get(self, city, method, day):
+        row = self.get_minutes(city, method, day)
+        if row is None:
+            return None
+        return {p: f"{m // 60:02d}:{m % 60:02d}" for p, m in zip(VALID_PRAYERS, row)}
+
+    def covers(self, city, method, year, month):
+        # الملفات المصدّرة من جداول الإنترنت قد تكون ناقصة، فنتأكد من أول وآخر يوم في الشهر
+        first = date(year, month, 1)
+        last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+        return self.get_minutes(city, method, first) is not None and self.get_minutes(city, method, last) is not None
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def open_packs(directory):
+    packs = []
+    if not os.path.isdir(directory):
+        return packs
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(PACK_SUFFIX):
+            try:
+                packs.append(TimetablePack(os.path.join(directory, name)))
+            except Exception as e:
+                print(f"تم تجاهل ملف مواقيت غير صالح {name}: {e}")
+    return packs
+
+
+def generate_entries(cities, start, days):
+    # حساب كل المدن بكل الأيام باستدعاء NumPy واحد
+    import numpy as np
+    import prayer_calc
+
+    places = [find_place(c) for c in cities]
+    dates = np.datetime64(start, "D") + np.arange(days)
+    lat = np.array([p.lat for p in places])[:, None]
+    lng = np.array([p.lng for p in places])[:, None]
+    methods = np.array([p.method for p in places])[:, None]
+    offsets = np.array([prayer_calc.utc_offsets_for(p.timezone, dates) for p in places])
+    minutes = prayer_calc.compute_minutes(lat, lng, dates[None, :], methods, offsets)
+    return [(c, p.timezone, p.method, minutes[i]) for i, (c, p) in enumerate(zip(cities, places))]
+
+
+def export_entries(cities, start, days, directory):
+    # من جداول الأشهر المحفوظة في مجلد timetable (قد تكون من aladhan.com)
+    from timetable import TimetableStore
+
+    store = TimetableStore(None, directory=directory, use_packs=False)
+    entries = []
+    for city in cities:
+        place = find_place(city)
+        method = place.method
+        rows = []
+        for i in range(days):
+            timings = store.get_day(city, method, start + timedelta(days=i), fetch=False)
+            if timings and all(p in timings for p in VALID_PRAYERS):
+                rows.append([int(timings[p][:2]) * 60 + int(timings[p][3:5]) for p in VALID_PRAYERS])
+            else:
+                rows.append(None)
+        if all(row is None for row in rows):
+            raise PackError(f"لا توجد مواقيت محفوظة للمدينة: {city}")
+        entries.append((city, place.timezone, method, rows))
+    return entries
+
+
+def main(argv=None):
+    from timetable import TIMETABLE_DIR
+
+    parser = argparse.ArgumentParser(description="ملفات المواقيت الثنائية")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("generate", "export"):
+        p = sub.add_parser(name)
+        p.add_argument("--year", type=int, default=date.today().year)
+        p.add_argument("--city", action="append")
+        p.add_argument("--out")
+        p.add_argument("--dir", default=TIMETABLE_DIR)
+    p = sub.add_parser("import")
+    p.add_argument("path")
+    p.add_argument("--dir", default=TIMETABLE_DIR)
+    p = sub.add_parser("show")
+    p.add_argument("path")
+    p.add_argument("--city")
+    p.add_argument("--date")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command in ("generate", "export"):
+            cities = args.city or list(CITIES)
+            unknown = [c for c in cities if find_place(c) is None]
+            if unknown:
+                raise PackError(f"مدن غير موجودة: {', '.join(unknown)}")
+            start = date(args.year, 1, 1)
+            days = (date(args.year + 1, 1, 1) - start).days
+            if args.command == "generate":
+                entries, source = generate_entries(cities, start, days), "local"
+            else:
+                entries, source = export_entries(cities, start, days, args.dir), "api"
+            out = args.out or os.path.join(args.dir, f"{args.year}_{source}{PACK_SUFFIX}")
+            size = write_pack(out, entries, start, days, source)
+            print(f"{out}: {len(entries)} مدينة، {days} يوم، {size} بايت")
+        elif args.command == "import":
+            pack = TimetablePack(args.path)
+            print(f"{pack.source}: {len(pack.cities)} مدينة من {pack.start} إلى {pack.end}")
+            pack.close()
+            os.makedirs(args.dir, exist_ok=True)
+            target = os.path.join(args.dir, os.path.basename(args.path))
+            if not target.endswith(PACK_SUFFIX):
+                target += PACK_SUFFIX
+            shutil.copyfile(args.path, target + ".tmp")
+            os.replace(target + ".tmp", target)
+            print(f"تم الاستيراد إلى {target}")
+        else:
+            pack = TimetablePack(args.path)
+            print(f"المصدر: {pack.source}، من {pack.start} إلى {pack.end}")
+            day = date.fromisoformat(args.date) if args.date else date.today()
+            for city, method in pack.cities:
+                if args.city and city != args.city:
+                    continue
+                print(f"{city} (طريقة {method}، {pack.cities[(city, method)][1]}): {pack.get(city, method, day)}")
+            pack.close()
+    except (PackError, OSError, ValueError) as e:
+        print(f"خطأ: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
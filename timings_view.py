@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# عرض المواقيت في الواجهة: صف ثابت لكل صلاة (الاسم، الوقت، العد التنازلي) يُنشأ مرة واحدة،
+# وكل تحديث يغيّر فقط الخلايا التي تغير نصها. الصلاة القادمة تُميَّز بعدّاد تنازلي يعمل على
+# مؤقت root.after واحد مضبوط على بداية كل ثانية.
+import math
+import time
+
+import ttkbootstrap as tb
+
+from prayer_data import VALID_PRAYERS, PRAYER_NAMES_AR
+
+NEXT_STYLE = "success"      # لون صف الصلاة القادمة
+TICK_MARGIN_MS = 5          # تأخير بسيط بعد بداية الثانية حتى لا يظهر الرقم السابق
+
+
+def format_countdown(seconds):
+    seconds = max(0, math.ceil(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"بعد {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+class TimingsView:
+    def __init__(self, master, format_time, next_prayer, font=("Tahoma", 13)):
+        # format_time(str) -> نص الوقت، next_prayer() -> (الصلاة، طابع زمني) أو None
+        self.format_time = format_time
+        self.next_prayer = next_prayer
+        self.frame = tb.Frame(master)
+        self.frame.columnconfigure(2, weight=1)
+        self.cells = {}     # (الصلاة، العمود) -> Label
+        self.shown = {}     # (الصلاة، العمود) -> (النص، النمط) المعروض حاليًا
+        self.redraws = 0    # عدد مرات تعديل خلية فعليًا (للقياس)
+        self.upcoming = None
+        self._tick_job = None
+        for row, prayer in enumerate(VALID_PRAYERS):
+            for col in range(3):
+                label = tb.Label(self.frame, text="", font=font)
+                label.grid(row=row, column=col, sticky="w", padx=6, pady=2)
+                self.cells[(prayer, col)] = label
+                self.shown[(prayer, col)] = ("", "default")
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_cell(self, prayer, col, text, style="default"):
+        key = (prayer, col)
+        if self.shown[key] == (text, style):
+            return
+        self.cells[key].configure(text=text, bootstyle=style)
+        self.shown[key] = (text, style)
+        self.redraws += 1
+
+    def highlight(self, prayer, style):
+        if prayer not in VALID_PRAYERS:
+            return
+        for col in range(2):
+            self.set_cell(prayer, col, self.shown[(prayer, col)][0], style)
+        if style != NEXT_STYLE:
+            self.set_cell(prayer, 2, "")
+
+    def update(self, timings):
+        # يُستدعى عند تغيير المواقيت أو المدينة أو صيغة الوقت
+        self.upcoming = self.next_prayer()
+        current = self.upcoming[0] if self.upcoming else None
+        for prayer in VALID_PRAYERS:
+            style = NEXT_STYLE if prayer == current else "default"
+            self.set_cell(prayer, 0, PRAYER_NAMES_AR.get(prayer, prayer), style)
+            self.set_cell(prayer, 1, self.format_time(timings.get(prayer, "--:--")), style)
+            if prayer != current:
+                self.set_cell(prayer, 2, "")
+        self.tick()
+
+    def tick(self):
+        # مؤقت واحد للعدّاد: أي استدعاء جديد يلغي المؤقت السابق
+        if self._tick_job is not None:
+            self.frame.after_cancel(self._tick_job)
+            self._tick_job = None
+        now = time.time()
+        if self.upcoming and self.upcoming[1] <= now:
+            # حان الموعد: ننقل التمييز إلى الصلاة التالية
+            self.highlight(self.upcoming[0], "default")
+            self.upcoming = self.next_prayer()
+            if self.upcoming:
+                self.highlight(self.upcoming[0], NEXT_STYLE)
+        if not self.upcoming:
+            return
+        prayer, when = self.upcoming
+        if prayer not in VALID_PRAYERS:
+            return
+        self.set_cell(prayer, 2, format_countdown(when - now), NEXT_STYLE)
+        delay = 1000 - int((now % 1) * 1000) + TICK_MARGIN_MS
+        self._tick_job = self.frame.after(delay, self.tick)
+
+    def stop(self):
+        if self._tick_job is not None:
+            self.frame.after_cancel(self._tick_job)
+            self._tick_job = None
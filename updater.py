@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+# التحديث التلقائي في الخلفية حسب ملف version.json (نفس صيغة الملف المرفق بالبرنامج):
+#   {"version": "1.0.2", "url": "https://.../adhan.exe", "sha256": "...", "size": 12345}
+#   - فحص الملف بطلب مشروط (ETag) وبدء عشوائي حتى لا تنزّل كل الأجهزة في نفس اللحظة
+#   - تنزيل على أجزاء مع الاستكمال (Range) بعد انقطاع الاتصال بدل إعادة التنزيل كاملًا
+#   - حد لسرعة التنزيل، والتوقف المؤقت أثناء تشغيل الأذان
+#   - التحقق من sha256 والحجم، ثم تجهيز التحديث في مجلد updates ليُستخدم عند التشغيل القادم:
+#     عند بدء البرنامج (قبل إنشاء الواجهة والخدمة) يُثبَّت بـ install_staged ثم يُعاد التشغيل بـ relaunch
+# خطوة الإصدار: بعد بناء adhan.exe وقبل رفعه يُحدَّث version.json ببصمة الملف وحجمه:
+#   python updater.py release dist/adhan.exe 1.0.2
+# ثم يُرفع الملف التنفيذي في إصدار v1.0.2 ويُدفع version.json. ملف إصدار بدون sha256 لا يُنزَّل.
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from urllib.parse import urlparse
+
+from player import resource_path
+
+UPDATE_MANIFEST_URL = "https://raw.githubusercontent.com/SameerHegazy/adhan-app/main/version.json"
+UPDATE_DIR = "updates"
+UPDATE_CHECK_INTERVAL = 6 * 3600    # فحص التحديثات كل 6 ساعات
+UPDATE_JITTER = 1800                # تأخير عشوائي (ثوانٍ) قبل أول فحص
+UPDATE_RATE_LIMIT = 256             # الحد الافتراضي لسرعة التنزيل (كيلوبايت/ثانية)، 0 = بلا حد
+CHUNK_SIZE = 64 * 1024
+UPDATE_TIMEOUT = (3.05, 30)
+BUSY_WAIT = 5                       # ثوانٍ بين كل فحص لانتهاء تشغيل الأذان
+STAGED_FILE = "staged.json"
+
+
+class UpdateError(Exception):
+    pass
+
+
+def parse_version(version):
+    parts = []
+    for part in str(version).strip().lstrip("vV").split("."):
+        digits = "".join(c for c in part if c.isdigit())
+        parts.append(int(digits) if digits else 0)
+    return tuple(parts)
+
+
+def current_version():
+    try:
+        with open(resource_path("version.json"), encoding="utf-8") as f:
+            return json.load(f).get("version", "0")
+    except Exception:
+        return "0"
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RateLimiter:
+    # يحسب الوقت اللازم لما نُزّل حتى الآن بالسرعة المحددة، وينام الفرق
+    def __init__(self, rate, stop_event):
+        self.rate = rate    # بايت/ثانية، 0 = بلا حد
+        self.stop_event = stop_event
+        self.start = time.monotonic()
+        self.total = 0
+
+    def consume(self, n):
+        if not self.rate:
+            return True
+        self.total += n
+        delay = self.start + self.total / self.rate - time.monotonic()
+        if delay > 0:
+            return not self.stop_event.wait(delay)
+        return True
+
+
+class Updater:
+    def __init__(self, manifest_url=UPDATE_MANIFEST_URL, version=None, directory=UPDATE_DIR,
+                 rate_limit=UPDATE_RATE_LIMIT * 1024, interval=UPDATE_CHECK_INTERVAL, jitter=UPDATE_JITTER,
+                 busy=None, log=None, chunk_size=CHUNK_SIZE, timeout=UPDATE_TIMEOUT):
+        # busy() -> True أثناء تشغيل الأذان: يتوقف التنزيل حتى لا ينافس الصوت على القرص والشبكة
+        self.manifest_url = manifest_url
+        self.version = version or current_version()
+        self.directory = directory
+        self.rate_limit = rate_limit
+        self.interval = interval
+        self.jitter = jitter
+        self.busy = busy
+        self.log = log or (lambda message, **fields: print(message))
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.state = "idle"     # idle, checking, downloading, staged, up_to_date, failed
+        self.latest = None
+        self.progress = 0
+        self._etag = None
+        self._manifest = None
+        self._session = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def status(self):
+        return {"version": self.version, "latest": self.latest, "state": self.state, "downloaded": self.progress}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="updater")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def _run(self):
+        if self._stop.wait(random.uniform(0, self.jitter)):
+            return
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                self.state = "failed"
+                self.log(f"فشل التحديث التلقائي: {e}", level="warning", event="update_failed")
+            if self._stop.wait(self.interval):
+                return
+
+    def run_once(self):
+        manifest = self.check()
+        if manifest is None:
+            return None
+        # التحديث المجهز يُثبَّت فقط عند بدء البرنامج (install_staged)، فلا ننزّل غيره ما دام ليس أقدم
+        staged = self.staged()
+        if staged and parse_version(staged.get("version")) >= parse_version(manifest["version"]):
+            self.state = "staged"
+            return staged
+        return self.download(manifest)
+
+    def check(self):
+        # يرجع ملف الإصدار إذا كان أحدث من الإصدار الحالي
+        self.state = "checking"
+        headers = {"If-None-Match": self._etag} if self._etag else {}
+        r = self.session().get(self.manifest_url, headers=headers, timeout=self.timeout)
+        if r.status_code == 304 and self._manifest is not None:
+            manifest = self._manifest
+        elif r.status_code == 200:
+            manifest = r.json()
+            if not manifest.get("version") or not manifest.get("url"):
+                raise UpdateError("ملف الإصدار غير صالح")
+            self._etag = r.headers.get("ETag")
+            self._manifest = manifest
+        else:
+            raise UpdateError(f"HTTP {r.status_code}")
+        self.latest = manifest["version"]
+        if parse_version(manifest["version"]) <= parse_version(self.version):
+            self.state = "up_to_date"
+            return None
+        return manifest
+
+    def paths(self, manifest):
+        name = os.path.basename(urlparse(manifest["url"]).path) or "update.bin"
+        target = os.path.join(self.directory, f"{manifest['version']}-{name}")
+        return target, target + ".part", target + ".part.json"
+
+    def download(self, manifest):
+        import requests
+
+        expected = (manifest.get("sha256") or "").lower()
+        if not expected:
+            # بدون بصمة لا يمكن التأكد من الملف، فلا نجهّزه للتشغيل
+            raise UpdateError("ملف الإصدار بدون sha256")
+        size = manifest.get("size")
+        os.makedirs(self.directory, exist_ok=True)
+        target, part, meta_path = self.paths(manifest)
+
+        # الجزء المنزّل سابقًا يُستكمل فقط إذا كان لنفس الملف
+        offset = 0
+        validator = None
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("sha256") == expected and os.path.exists(part):
+                offset = os.path.getsize(part)
+                validator = meta.get("etag") or meta.get("last_modified")
+        except Exception:
+            pass
+        if not offset and os.path.exists(part):
+            os.remove(part)
+
+        self.state = "downloading"
+        self.progress = offset
+        self.log(f"تنزيل التحديث {manifest['version']}" + (f" (استكمال من {offset} بايت)" if offset else ""),
+                 event="update_download", version=manifest["version"], offset=offset)
+
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if validator:
+                headers["If-Range"] = validator
+        limiter = RateLimiter(self.rate_limit, self._stop)
+        try:
+            with self.session().get(manifest["url"], headers=headers, stream=True, timeout=self.timeout) as r:
+                if r.status_code == 200:
+                    # الخادم لا يدعم الاستكمال أو تغير الملف: من البداية
+                    offset = 0
+                elif r.status_code == 416 and offset:
+                    # الجزء المنزّل مكتمل من قبل
+                    offset = None
+                elif r.status_code != 206:
+                    raise UpdateError(f"HTTP {r.status_code}")
+                if offset is not None:
+                    self.save_part(r, part, meta_path, offset, expected, manifest["url"], limiter)
+        except requests.RequestException as e:
+            # الجزء المنزّل يبقى ويُستكمل في المحاولة القادمة
+            raise UpdateError(f"انقطع التنزيل عند {self.progress} بايت: {e}")
+        if self._stop.is_set():
+            self.state = "idle"
+            return None
+
+        if size and os.path.getsize(part) != size:
+            actual = os.path.getsize(part)
+            os.remove(part)
+            os.remove(meta_path)
+            raise UpdateError(f"حجم الملف غير متوقع: {actual} بدل {size}، تم حذفه")
+        digest = sha256_file(part)
+        if digest != expected:
+            os.remove(part)
+            os.remove(meta_path)
+            raise UpdateError("بصمة الملف غير مطابقة، تم حذفه")
+
+        os.replace(part, target)
+        os.remove(meta_path)
+        staged = {"version": manifest["version"], "file": os.path.basename(target), "sha256": expected}
+        with open(os.path.join(self.directory, STAGED_FILE), "w", encoding="utf-8") as f:
+            json.dump(staged, f)
+        # حذف تحديثات أقدم جُهّزت ولم تُثبَّت
+        for name in os.listdir(self.directory):
+            if name != STAGED_FILE and not name.startswith(f"{manifest['version']}-"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+        self.state = "staged"
+        self.log(f"تم تجهيز التحديث {manifest['version']} وسيُستخدم عند التشغيل القادم",
+                 event="update_staged", version=manifest["version"])
+        return staged
+
+    def save_part(self, r, part, meta_path, offset, expected, url, limiter):
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"sha256": expected, "url": url, "etag": r.headers.get("ETag"),
+                       "last_modified": r.headers.get("Last-Modified")}, f)
+        with open(part, "r+b" if offset else "wb") as f:
+            f.seek(offset)
+            f.truncate()
+            self.progress = offset
+            for chunk in r.iter_content(self.chunk_size):
+                if not chunk:
+                    continue
+                f.write(chunk)
+                self.progress += len(chunk)
+                if not limiter.consume(len(chunk)) or not self.wait_idle():
+                    return
+
+    def wait_idle(self):
+        while self.busy is not None and self.busy():
+            if self._stop.wait(BUSY_WAIT):
+                return False
+        return not self._stop.is_set()
+
+    def staged(self):
+        # التحديث المجهز، بعد التأكد من أن الملف موجود وبصمته صحيحة
+        try:
+            with open(os.path.join(self.directory, STAGED_FILE), encoding="utf-8") as f:
+                staged = json.load(f)
+            path = os.path.join(self.directory, staged["file"])
+            if sha256_file(path) == staged["sha256"]:
+                return staged
+        except Exception:
+            pass
+        return None
+
+
+def install_staged(directory=UPDATE_DIR, target=None, log=print):
+    # يُستدعى عند بدء البرنامج: على ويندوز يمكن إعادة تسمية الملف التنفيذي العامل، فيُنقل الجديد مكانه
+    # ويعمل من التشغيل التالي. عند التشغيل من الكود المصدري يبقى التحديث مجهزًا فقط.
+    if target is None:
+        if not getattr(sys, "frozen", False):
+            return False
+        target = sys.executable
+    old = target + ".old"
+    try:
+        if os.path.exists(old):
+            os.remove(old)
+    except OSError:
+        pass
+    staged = Updater(directory=directory).staged()
+    if staged is None:
+        return False
+    if parse_version(staged["version"]) <= parse_version(current_version()):
+        os.remove(os.path.join(directory, STAGED_FILE))
+        return False
+    try:
+        os.replace(target, old)
+        os.replace(os.path.join(directory, staged["file"]), target)
+        os.remove(os.path.join(directory, STAGED_FILE))
+    except OSError as e:
+        log(f"تعذر تثبيت التحديث: {e}")
+        return False
+    log(f"تم تثبيت التحديث {staged['version']}")
+    return True
+
+
+def relaunch(argv=None):
+    # تشغيل الملف التنفيذي الجديد بدل العملية الحالية بعد install_staged، بنفس المعاملات.
+    # يجب إغلاق مقبس "البرنامج مفتوح بالفعل" قبلها حتى تستطيع النسخة الجديدة حجزه
+    argv = [sys.executable] + list(sys.argv[1:] if argv is None else argv)
+    if sys.platform == "win32":
+        # execv على ويندوز ينشئ عملية جديدة أصلًا ولا يحافظ على وحدة التحكم، فنشغلها مباشرة ونخرج
+        import subprocess
+        subprocess.Popen(argv, close_fds=True)
+        os._exit(0)
+    os.execv(sys.executable, argv)
+
+
+RELEASE_URL = "https://github.com/SameerHegazy/adhan-app/releases/download/v{version}/{name}"
+
+
+def write_manifest(binary, version, manifest="version.json"):
+    # يكتب ملف الإصدار للملف التنفيذي المبني: رابط الإصدار وبصمته وحجمه
+    data = {
+        "version": version,
+        "url": RELEASE_URL.format(version=version, name=os.path.basename(binary)),
+        "sha256": sha256_file(binary),
+        "size": os.path.getsize(binary),
+    }
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    return data
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "release":
+        print(json.dumps(write_manifest(sys.argv[2], sys.argv[3]), indent=2))
+    else:
+        print("الاستخدام: python updater.py release <adhan.exe> <الإصدار>")